@@ -16,10 +16,10 @@ class AuditLogAdmin(admin.ModelAdmin):
 
 
 class DataTransferJobAdmin(admin.ModelAdmin):
-	list_display = ("job_type", "target_model", "status", "initiated_by", "created_at")
+	list_display = ("job_type", "target_model", "status", "rows_processed", "rows_failed", "initiated_by", "created_at")
 	list_filter = ("job_type", "status")
 	search_fields = ("target_model", "initiated_by__username")
-	readonly_fields = ("created_at",)
+	readonly_fields = ("created_at", "updated_at")
 
 
 class RecommendationPlacementAdmin(admin.ModelAdmin):
@@ -11,6 +11,8 @@ class ProductForm(forms.ModelForm):
     Note: Rating is excluded as it should be calculated from customer reviews,
     not manually edited by admins.
     """
+    # Product version the form was rendered from, used to detect concurrent edits
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
     
     class Meta:
         model = Product
@@ -60,6 +62,16 @@ class ProductForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['category'].queryset = Category.objects.all().order_by('name')
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.version
+    
+    def changed_values(self):
+        """Cleaned values of the model fields the user actually changed"""
+        return {
+            name: self.cleaned_data[name]
+            for name in self.changed_data
+            if name in self._meta.fields
+        }
     
     def clean_sku(self):
         sku = self.cleaned_data.get('sku')
@@ -186,13 +198,58 @@ class CustomerForm(forms.ModelForm):
 
 
 class OrderStatusUpdateForm(forms.Form):
-    """Form for updating order status"""
+    """Form for updating order status
+    
+    Only the current status and the statuses it may move to are offered.
+    """
     status = forms.ChoiceField(
         choices=Order.STATUS_CHOICES,
         widget=forms.Select(attrs={
             'class': 'w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-cyan focus:border-transparent'
         })
     )
+    
+    def __init__(self, *args, current_status=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if current_status:
+            allowed = {current_status, *Order.ALLOWED_TRANSITIONS.get(current_status, ())}
+            self.fields['status'].choices = [
+                (value, label) for value, label in Order.STATUS_CHOICES if value in allowed
+            ]
+
+
+class BulkOrderStatusForm(forms.Form):
+    """Form for moving several orders to a new status at once"""
+    APPLY_SELECTED = 'selected'
+    APPLY_FILTERED = 'filtered'
+    
+    orders = forms.ModelMultipleChoiceField(
+        queryset=Order.objects.only('id'),
+        widget=forms.CheckboxSelectMultiple,
+        required=False
+    )
+    target_status = forms.ChoiceField(
+        choices=[(value, label) for value, label in Order.STATUS_CHOICES if Order.allowed_sources(value)],
+        widget=forms.Select(attrs={
+            'class': 'px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-cyan focus:border-transparent'
+        })
+    )
+    apply_to = forms.ChoiceField(
+        choices=[
+            (APPLY_SELECTED, 'Selected orders'),
+            (APPLY_FILTERED, 'All orders matching the current filters'),
+        ],
+        initial=APPLY_SELECTED,
+        widget=forms.Select(attrs={
+            'class': 'px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-cyan focus:border-transparent'
+        })
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('apply_to') == self.APPLY_SELECTED and not cleaned_data.get('orders'):
+            raise forms.ValidationError('Select at least one order.')
+        return cleaned_data
 
 
 class PromotionForm(forms.ModelForm):
@@ -0,0 +1,301 @@
+"""
+ADM006 – Streaming bulk importers backed by DataTransferJob progress tracking.
+
+Uploads are decoded and parsed line by line and applied in fixed-size chunks,
+so memory use is bounded by the chunk size rather than by the file size.
+"""
+import codecs
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from storefront.models import Order, Product
+from storefront.utils.caching import CACHE_KEY_PRODUCT_CATALOG
+from storefront.utils.inventory import record_stock_movements
+from storefront.utils.orders import transition_orders
+from .models import AuditLog
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# Statuses a carrier manifest may set, in lifecycle order
+CARRIER_STATUSES = ('shipped', 'delivered')
+# File extensions accepted for carrier manifests, mapped to their format
+MANIFEST_FORMATS = {
+    '.csv': 'csv',
+    '.json': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.ndjson': 'ndjson',
+}
+
+
+def iter_csv_rows(file_obj, encoding='utf-8-sig'):
+    """Yield ``(row_number, row)`` pairs from a binary CSV file without reading it whole."""
+    reader = csv.DictReader(codecs.iterdecode(file_obj, encoding))
+    # Row 1 is the header, so data rows start at 2 (matching spreadsheet numbering)
+    yield from enumerate(reader, start=2)
+
+
+def iter_ndjson_rows(file_obj, encoding='utf-8-sig'):
+    """
+    Yield ``(line_number, row)`` pairs from a newline-delimited JSON file.
+
+    Blank lines are skipped. Lines that are not valid JSON yield ``None`` so
+    callers can report them against their line number and carry on.
+    """
+    for line_num, line in enumerate(codecs.iterdecode(file_obj, encoding), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError:
+            yield line_num, None
+
+
+def manifest_format(file_name):
+    """The manifest format implied by ``file_name``'s extension, or None if unsupported."""
+    return MANIFEST_FORMATS.get(os.path.splitext(file_name)[1].lower())
+
+
+def chunked(iterable, size):
+    """Yield successive lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ImportErrors:
+    """Collects per-row errors, keeping only the first few in memory."""
+
+    def __init__(self, limit=MAX_REPORTED_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.messages = []
+
+    def add(self, row_num, message):
+        self.count += 1
+        if len(self.messages) < self.limit:
+            self.messages.append(f"Row {row_num}: {message}")
+
+
+def _record_progress(job, processed, errors, status=None, message=None):
+    job.rows_processed = processed
+    job.rows_failed = errors.count
+    fields = ['rows_processed', 'rows_failed', 'updated_at']
+    if status:
+        job.status = status
+        fields.append('status')
+    if message is not None:
+        job.message = message
+        fields.append('message')
+    job.save(update_fields=fields)
+
+
+def _failure_message(reason, exc, processed):
+    # Chunks commit as they go, so a failure part way leaves earlier ones applied
+    message = f'{reason}: {exc}.'
+    if processed:
+        message += f' The first {processed} row(s) were already applied and are not rolled back.'
+    return message
+
+
+def import_stock_levels(file_obj, job, actor=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Apply a stocktake CSV (columns ``SKU`` and ``Stock``) to product inventory.
+
+    Each chunk is diffed against current stock with one keyed query and only
+    changed products are written, via ``bulk_update``. Progress and per-row
+    errors are recorded on ``job``. Returns ``(updated_count, errors)``.
+    """
+    errors = ImportErrors()
+    processed = 0
+    updated_count = 0
+    _record_progress(job, processed, errors, status='running')
+
+    try:
+        for chunk in chunked(iter_csv_rows(file_obj), chunk_size):
+            counts = {}
+            for row_num, row in chunk:
+                sku = (row.get('SKU') or '').strip()
+                raw_stock = (row.get('Stock') or '').strip()
+                if not sku:
+                    errors.add(row_num, 'SKU is required')
+                    continue
+                try:
+                    stock = int(raw_stock)
+                except ValueError:
+                    errors.add(row_num, f'Invalid stock count "{raw_stock}" for {sku}')
+                    continue
+                if stock < 0:
+                    errors.add(row_num, f'Stock cannot be negative for {sku}')
+                    continue
+                # A later row for the same SKU wins, as it would in a spreadsheet
+                counts[sku] = (row_num, stock)
+
+            with transaction.atomic():
+                products = (
+                    Product.objects.select_for_update()
+                    .only('id', 'sku', 'name', 'stock', 'reorder_threshold', 'version')
+                    .in_bulk(list(counts), field_name='sku')
+                )
+                now = timezone.now()
+                changed = []
+                movements = {}
+                audit_entries = []
+                for sku, (row_num, stock) in counts.items():
+                    product = products.get(sku)
+                    if product is None:
+                        errors.add(row_num, f'Unknown SKU {sku}')
+                        continue
+                    if product.stock == stock:
+                        continue
+                    audit_entries.append(AuditLog(
+                        actor=actor,
+                        action='update',
+                        entity_type='Product',
+                        entity_id=sku,
+                        summary=f'Stocktake set stock from {product.stock} to {stock} for product: {product.name}'
+                    ))
+                    movements[product.pk] = stock - product.stock
+                    product.stock = stock
+                    product.is_low_stock = stock <= product.reorder_threshold
+                    product.version += 1
+                    product.updated_at = now
+                    changed.append(product)
+
+                Product.objects.bulk_update(changed, ['stock', 'is_low_stock', 'version', 'updated_at'])
+                record_stock_movements(movements, 'stocktake', reference=f'job-{job.pk}', actor=actor)
+                AuditLog.objects.bulk_create(audit_entries)
+
+            processed += len(chunk)
+            updated_count += len(changed)
+            _record_progress(job, processed, errors)
+    except (UnicodeDecodeError, csv.Error) as e:
+        _record_progress(
+            job, processed, errors, status='failed',
+            message=_failure_message('Could not read file', e, processed),
+        )
+        raise
+    except Exception as e:
+        _record_progress(
+            job, processed, errors, status='failed',
+            message=_failure_message('Import failed', e, processed),
+        )
+        raise
+
+    summary = f'Processed {processed} row(s): {updated_count} product(s) updated, {errors.count} error(s).'
+    if errors.messages:
+        summary += '\n' + '\n'.join(errors.messages)
+    _record_progress(job, processed, errors, status='succeeded', message=summary)
+
+    if updated_count:
+        cache.delete(CACHE_KEY_PRODUCT_CATALOG)
+    return updated_count, errors
+
+
+def _parse_manifest_row(row_num, row, errors):
+    """Return ``(order_id, status)`` for a manifest row, or None after recording an error."""
+    if not isinstance(row, dict):
+        errors.add(row_num, 'Invalid JSON')
+        return None
+    # CSV manifests use the order export headings; JSON lines use snake_case keys
+    raw_id = str(row.get('Order ID', row.get('order_id')) or '').strip().lstrip('#')
+    raw_status = str(row.get('Status', row.get('status')) or '').strip().lower()
+    try:
+        order_id = int(raw_id)
+    except ValueError:
+        errors.add(row_num, f'Invalid order ID "{raw_id}"')
+        return None
+    if raw_status not in CARRIER_STATUSES:
+        errors.add(row_num, f'Unsupported status "{raw_status}" for order #{order_id}')
+        return None
+    return order_id, raw_status
+
+
+def import_carrier_manifest(file_obj, job, actor=None, file_format='csv', chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Apply a carrier manifest of order status updates (shipped/delivered).
+
+    ``file_format`` is ``'csv'`` (columns ``Order ID`` and ``Status``) or
+    ``'ndjson'`` (one ``{"order_id": ..., "status": ...}`` object per line).
+    Each chunk is validated against current statuses with one query, walking
+    rows in file order so an order may be shipped and delivered in the same
+    manifest. Rows that restate an order's current status are ignored, so a
+    manifest can safely be re-imported. Valid updates are applied with one
+    guarded ``UPDATE`` per target status via ``transition_orders``. Progress
+    and per-row errors are recorded on ``job``. Returns ``(updated_count, errors)``.
+    """
+    rows = iter_csv_rows(file_obj) if file_format == 'csv' else iter_ndjson_rows(file_obj)
+    errors = ImportErrors()
+    processed = 0
+    updated_count = 0
+    _record_progress(job, processed, errors, status='running')
+
+    try:
+        for chunk in chunked(rows, chunk_size):
+            updates = []
+            for row_num, row in chunk:
+                parsed = _parse_manifest_row(row_num, row, errors)
+                if parsed:
+                    updates.append((row_num, *parsed))
+
+            with transaction.atomic():
+                statuses = dict(
+                    Order.objects.filter(pk__in={order_id for _, order_id, _ in updates})
+                    .values_list('pk', 'status')
+                )
+                targets = {status: [] for status in CARRIER_STATUSES}
+                for row_num, order_id, target in updates:
+                    current = statuses.get(order_id)
+                    if current is None:
+                        errors.add(row_num, f'Unknown order #{order_id}')
+                    elif current == target:
+                        continue
+                    elif target not in Order.ALLOWED_TRANSITIONS.get(current, ()):
+                        errors.add(row_num, f'Order #{order_id} cannot move from {current} to {target}')
+                    else:
+                        statuses[order_id] = target
+                        targets[target].append((row_num, order_id))
+
+                # Apply earlier lifecycle steps first so shipped -> delivered works in one chunk
+                for target, pending in targets.items():
+                    if not pending:
+                        continue
+                    applied = set(transition_orders(
+                        Order.objects.filter(pk__in=[order_id for _, order_id in pending]),
+                        target,
+                        actor=actor,
+                    ))
+                    for row_num, order_id in pending:
+                        if order_id not in applied:
+                            errors.add(row_num, f'Order #{order_id} changed status concurrently')
+                    updated_count += len(applied)
+
+            processed += len(chunk)
+            _record_progress(job, processed, errors)
+    except (UnicodeDecodeError, csv.Error) as e:
+        _record_progress(
+            job, processed, errors, status='failed',
+            message=_failure_message('Could not read file', e, processed),
+        )
+        raise
+    except Exception as e:
+        _record_progress(
+            job, processed, errors, status='failed',
+            message=_failure_message('Import failed', e, processed),
+        )
+        raise
+
+    summary = f'Processed {processed} row(s): {updated_count} order status update(s), {errors.count} error(s).'
+    if errors.messages:
+        summary += '\n' + '\n'.join(errors.messages)
+    _record_progress(job, processed, errors, status='succeeded', message=summary)
+    return updated_count, errors
@@ -0,0 +1,63 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.importers import (
+    IMPORT_CHUNK_SIZE, MANIFEST_FORMATS, import_carrier_manifest, manifest_format,
+)
+from admin_panel.models import DataTransferJob
+
+
+class Command(BaseCommand):
+    help = 'Apply order status updates from a carrier manifest (CSV with Order ID, Status columns, or JSON lines)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='Path to the carrier manifest')
+        parser.add_argument(
+            '--format',
+            choices=sorted(set(MANIFEST_FORMATS.values())),
+            help='Manifest format (defaults to the one implied by the file extension)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Number of rows to validate and apply per batch'
+        )
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            raise CommandError(f'File not found: {file_path}')
+
+        file_format = options['format'] or manifest_format(file_path)
+        if file_format is None:
+            raise CommandError(
+                f'Cannot tell the manifest format of {file_path}; pass --format '
+                f'or use one of: {", ".join(MANIFEST_FORMATS)}'
+            )
+
+        job = DataTransferJob.objects.create(
+            job_type='import',
+            target_model='Order status',
+            source_file_path=file_path,
+        )
+
+        with open(file_path, 'rb') as f:
+            try:
+                updated_count, errors = import_carrier_manifest(
+                    f, job, file_format=file_format, chunk_size=options['chunk_size']
+                )
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise CommandError(f'Could not read {file_path}: {e}')
+
+        for error in errors.messages:
+            self.stdout.write(self.style.WARNING(error))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Carrier manifest job #{job.id} completed: {job.rows_processed} row(s) processed, '
+                f'{updated_count} order(s) updated, {errors.count} error(s).'
+            )
+        )
@@ -0,0 +1,47 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_panel.importers import IMPORT_CHUNK_SIZE, import_stock_levels
+from admin_panel.models import DataTransferJob
+
+
+class Command(BaseCommand):
+    help = 'Set product stock levels from a warehouse stocktake CSV (columns: SKU, Stock)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', type=str, help='Path to the stocktake CSV file')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help='Number of rows to diff and apply per batch'
+        )
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            raise CommandError(f'File not found: {file_path}')
+
+        job = DataTransferJob.objects.create(
+            job_type='import',
+            target_model='Product stock',
+            source_file_path=file_path,
+        )
+
+        with open(file_path, 'rb') as f:
+            try:
+                updated_count, errors = import_stock_levels(f, job, chunk_size=options['chunk_size'])
+            except (UnicodeDecodeError, csv.Error) as e:
+                raise CommandError(f'Could not read {file_path}: {e}')
+
+        for error in errors.messages:
+            self.stdout.write(self.style.WARNING(error))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Stocktake job #{job.id} completed: {job.rows_processed} row(s) processed, '
+                f'{updated_count} product(s) updated, {errors.count} error(s).'
+            )
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datatransferjob',
+            name='rows_failed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datatransferjob',
+            name='rows_processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='datatransferjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
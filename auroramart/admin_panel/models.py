@@ -52,7 +52,10 @@ class DataTransferJob(models.Model):
     initiated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='data_jobs')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     message = models.TextField(blank=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save, pre_delete
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from storefront.models import Product, Order
@@ -12,6 +12,10 @@ User = get_user_model()
 def log_product_save(sender, instance, created, **kwargs):
     """Log product create/update"""
     action = 'create' if created else 'update'
+    changed = [] if created else instance.changed_fields(kwargs.get('update_fields'))
+    if not created and not changed:
+        # Nothing an admin would recognise changed (e.g. a no-op save)
+        return
     actor = None
     
     # Try to get the current user from thread-local storage
@@ -30,7 +34,7 @@ def log_product_save(sender, instance, created, **kwargs):
         action=action,
         entity_type='Product',
         entity_id=str(instance.sku),
-        summary=f'{action.capitalize()}d product: {instance.name}'
+        summary=f'{action.capitalize()}d product: {instance.name}' + (f' ({", ".join(changed)})' if changed else '')
     )
 
 
@@ -60,14 +64,14 @@ def log_order_status_change(sender, instance, created, **kwargs):
     """Log order status changes"""
     if not created:
         # Only log status changes, not creation
-        # Determine whether status changed. If `update_fields` is provided use it,
-        # otherwise fall back to the value cached on the instance by `pre_save`.
+        # Determine whether status changed. If `update_fields` is provided and
+        # omits status it cannot have changed; otherwise ask the field tracker.
         update_fields = kwargs.get('update_fields', None)
-        status_changed = False
-        if update_fields is not None:
-            status_changed = 'status' in update_fields
+        if update_fields is not None and 'status' not in update_fields:
+            status_changed = False
         else:
-            status_changed = getattr(instance, '_old_status', None) != getattr(instance, 'status', None)
+            # Compared against the value loaded from the database, so no extra query
+            status_changed = instance.has_changed('status')
 
         if status_changed:
             actor = None
@@ -89,24 +93,12 @@ def log_order_status_change(sender, instance, created, **kwargs):
 
 
 
-@receiver(pre_save, sender=Order)
-def cache_order_status(sender, instance, **kwargs):
-    """Cache the existing order status on the instance before save so post_save
-    can determine whether the status changed when update_fields isn't provided.
-    """
-    if instance.pk:
-        try:
-            old = Order.objects.get(pk=instance.pk)
-            instance._old_status = old.status
-        except Order.DoesNotExist:
-            instance._old_status = None
-
-
 @receiver(post_save, sender=Customer)
 def log_customer_update(sender, instance, created, **kwargs):
     """Log customer demographic updates"""
-    if not created:
-        # Only log updates, not creation
+    changed = [] if created else instance.changed_fields(kwargs.get('update_fields'))
+    if changed:
+        # Only log updates that changed demographics, not creation
         actor = None
         try:
             import threading
@@ -121,6 +113,6 @@ def log_customer_update(sender, instance, created, **kwargs):
             action='update',
             entity_type='Customer',
             entity_id=str(instance.id),
-            summary=f'Updated customer: {instance.user.username}'
+            summary=f'Updated customer: {instance.user.username} ({", ".join(changed)})'
         )
 
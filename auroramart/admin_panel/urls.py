@@ -30,6 +30,8 @@ urlpatterns = [
     path('promotions/<int:promotion_id>/delete/', views.promotion_delete, name='promotion_delete'),
     path('chat/', views.chat_support, name='chat'),
     path('chat/<int:session_id>/', views.chat_detail_admin, name='chat_detail'),
+    path('chat/<int:session_id>/messages/', views.chat_messages_admin, name='chat_messages'),
+    path('chat/<int:session_id>/stream/', views.chat_stream_admin, name='chat_stream'),
     path('import-export/', views.import_export, name='import_export'),
     path('recommendations/', views.recommendation_placement_list, name='recommendations'),
     path('preferred-category/', views.preferred_category_analysis, name='preferred_category'),
@@ -40,6 +42,7 @@ urlpatterns = [
     path('admin-users/<int:user_id>/delete/', views.admin_user_delete, name='admin_user_delete'),
     path('aurora', views.aurora_chatbot_logs, name='aurora_chatbot_logs'),
     path('aurora/chat/<int:session_id>', views.aurora_chat_detail, name='aurora_chat_detail'),
+    path('aurora/chat/<int:session_id>/messages', views.aurora_chat_messages, name='aurora_chat_messages'),
     path('aurora/chat/<int:session_id>/inactive', views.make_chat_inactive, name='make_chat_inactive'),
     path('aurora/chat/<int:session_id>/delete', views.delete_chat, name='delete_chat'),
     path('aurora/chat/delete', views.delete_inactive_chats, name='delete_inactive_chats'),
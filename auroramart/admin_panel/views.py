@@ -1,18 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, F, Q, Avg, Count, Case, When, IntegerField
+from django.db import transaction
+from django.db.models import Sum, Q, Count, Case, When, IntegerField
 from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
+from itertools import chain
 from decimal import Decimal
 
-from storefront.models import Product, Order, OrderItem, Category, Review, ChatSession, ChatMessage, Promotion, AiChatSession, AiChatMessage
+from storefront.models import Product, Order, OrderItem, ArchivedOrder, Category, Review, ChatSession, ChatMessage, Promotion, AiChatSession, AiChatMessage
 from users.models import Customer, User
-from admin_panel.models import RecommendationPlacement, AnalyticsMetric, AuditLog
+from storefront.utils.chat import (
+    chat_event_stream, messages_since, parse_since_id, support_queue_counts, transcript_page,
+    with_queue_stats,
+)
+from storefront.utils.inventory import (
+    bulk_adjust_stock, record_stock_movements, update_product_if_current,
+)
+from storefront.utils.orders import archive_totals, transition_orders
+from storefront.utils.pricing import promoted_product_ids, record_price_changes
+from storefront.utils.reviews import approve_reviews, reject_reviews
+from admin_panel.models import RecommendationPlacement, AnalyticsMetric, AuditLog, DataTransferJob
 from .decorators import staff_required
-from .forms import ProductForm, CategoryForm, BulkInventoryUpdateForm, CustomerForm, OrderStatusUpdateForm, PromotionForm, AdminUserForm, AdminUserCreateForm
+from .importers import import_carrier_manifest, import_stock_levels, manifest_format
+from .forms import ProductForm, CategoryForm, BulkInventoryUpdateForm, CustomerForm, OrderStatusUpdateForm, BulkOrderStatusForm, PromotionForm, AdminUserForm, AdminUserCreateForm
 
 def index(request):
     """Redirect to admin login or dashboard based on authentication"""
@@ -72,10 +86,15 @@ def dashboard(request):
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     week_start = today_start - timedelta(days=7)
     
+    # Archived orders only change when archive_orders runs, so their totals are cached
+    archived = archive_totals()
+    
     # Calculate total revenue (delivered orders only)
-    total_revenue = Order.objects.filter(status='delivered').aggregate(
-        total=Sum('total_price')
-    )['total'] or Decimal('0.00')
+    delivered = Order.objects.filter(status='delivered').aggregate(
+        total=Sum('total_price'),
+        count=Count('id')
+    )
+    total_revenue = (delivered['total'] or Decimal('0.00')) + (archived['revenue'] or Decimal('0.00'))
     
     # Orders today
     orders_today = Order.objects.filter(created_at__gte=today_start).count()
@@ -84,26 +103,22 @@ def dashboard(request):
     orders_this_week = Order.objects.filter(created_at__gte=week_start).count()
     
     # Average Order Value (AOV)
-    aov_result = Order.objects.filter(status='delivered').aggregate(
-        avg=Avg('total_price')
-    )
-    aov = aov_result['avg'] or Decimal('0.00')
+    delivered_count = delivered['count'] + archived['delivered']
+    aov = (total_revenue / delivered_count) if delivered_count else Decimal('0.00')
     
     # Attach rate (% orders with >1 item)
-    total_orders_with_items = Order.objects.annotate(
-        item_count=Count('items')
-    ).filter(item_count__gt=1).count()
-    total_orders_count = Order.objects.count()
+    total_orders_with_items = Order.objects.filter(item_count__gt=1).count() + archived['multi_item']
+    total_orders_count = Order.objects.count() + archived['orders']
     attach_rate = (total_orders_with_items / total_orders_count * 100) if total_orders_count > 0 else Decimal('0.00')
     
     # Low stock count (products below reorder threshold)
     low_stock_count = Product.objects.filter(
-        stock__lte=F('reorder_threshold'),
+        is_low_stock=True,
         archived=False
     ).count()
     
     # Total counts
-    total_orders = Order.objects.count()
+    total_orders = total_orders_count
     total_customers = Customer.objects.count()
     total_products = Product.objects.filter(archived=False).count()
     
@@ -117,7 +132,7 @@ def dashboard(request):
     
     # Get low stock products
     low_stock_products = Product.objects.filter(
-        stock__lte=F('reorder_threshold'),
+        is_low_stock=True,
         archived=False
     ).order_by('stock')[:5]
     
@@ -197,7 +212,9 @@ def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST)
         if form.is_valid():
-            product = form.save()
+            with transaction.atomic():
+                product = form.save()
+                record_stock_movements({product.pk: product.stock}, 'initial', actor=request.user)
             messages.success(request, f'Product \"{product.name}\" created successfully!')
             # Redirect to the product list view (named \"products\" in urls.py)
             return redirect('admin_panel:products')
@@ -216,19 +233,41 @@ def product_update(request, sku):
     """Update an existing product"""
     product = get_object_or_404(Product, sku=sku)
     
+    conflict = None
+    
     if request.method == 'POST':
         form = ProductForm(request.POST, instance=product)
         if form.is_valid():
-            product = form.save()
-            messages.success(request, f'Product "{product.name}" updated successfully!')
-            # Redirect back to product list (URL name is 'products')
-            return redirect('admin_panel:products')
+            changes = form.changed_values()
+            expected_version = form.cleaned_data['version'] or product.version
+            # Keep the values the form was diffed against; is_valid() applied the edits
+            current = Product.objects.get(pk=product.pk)
+            if update_product_if_current(current, changes, expected_version, actor=request.user):
+                messages.success(request, f'Product "{current.name}" updated successfully!')
+                # Redirect back to product list (URL name is 'products')
+                return redirect('admin_panel:products')
+            
+            # Someone else saved first: show their values next to ours and let the
+            # user resubmit against the current version
+            product = current
+            conflict = [
+                {
+                    'label': form.fields[name].label,
+                    'current': getattr(product, name),
+                    'submitted': value,
+                }
+                for name, value in changes.items()
+            ]
+            data = request.POST.copy()
+            data['version'] = product.version
+            form = ProductForm(data, instance=product)
     else:
         form = ProductForm(instance=product)
     
     return render(request, 'admin_panel/product_form.html', {
         'form': form,
         'product': product,
+        'conflict': conflict,
         'form_title': f'Edit Product: {product.name}',
         'submit_label': 'Update Product'
     })
@@ -244,7 +283,7 @@ def product_delete(request, sku):
         # Archive instead of delete to preserve order history
         product.archived = True
         product.is_active = False
-        product.save()
+        product.save(update_fields=['archived', 'is_active', 'updated_at'])
         messages.success(request, f'Product \"{product_name}\" has been archived.')
         # Redirect back to product list (URL name is 'products')
         return redirect('admin_panel:products')
@@ -344,7 +383,7 @@ def inventory_management(request):
     
     # Apply filter
     if filter_type == 'low_stock':
-        products = products.filter(stock__lte=F('reorder_threshold'))
+        products = products.filter(is_low_stock=True)
     elif filter_type == 'out_of_stock':
         products = products.filter(stock=0)
     
@@ -357,26 +396,29 @@ def inventory_management(request):
         if form.is_valid():
             selected_products = form.cleaned_data['products']
             adjustment = form.cleaned_data['stock_adjustment']
-            
-            updated_count = 0
-            for product in selected_products:
-                new_stock = product.stock + adjustment
-                if new_stock >= 0:
-                    product.stock = new_stock
-                    product.save()
-                    updated_count += 1
-                else:
-                    messages.warning(request, f'{product.name}: Cannot set stock below 0.')
-            
-            if updated_count > 0:
-                messages.success(request, f'Updated stock for {updated_count} product(s).')
+
+            updated, rejected = bulk_adjust_stock(
+                [product.pk for product in selected_products],
+                adjustment,
+                actor=request.user,
+            )
+
+            if rejected:
+                # Summarise rather than emitting one message per rejected SKU
+                preview = ', '.join(rejected[:5])
+                if len(rejected) > 5:
+                    preview += f' and {len(rejected) - 5} more'
+                messages.warning(request, f'Cannot set stock below 0 for {len(rejected)} product(s): {preview}.')
+
+            if updated:
+                messages.success(request, f'Updated stock for {len(updated)} product(s).')
             return redirect('admin_panel:inventory')
     else:
         form = BulkInventoryUpdateForm()
         # Pre-populate with products matching current filters
         if filter_type == 'low_stock':
             form.fields['products'].queryset = Product.objects.filter(
-                archived=False, stock__lte=F('reorder_threshold')
+                archived=False, is_low_stock=True
             )
     
     # Pagination
@@ -487,6 +529,32 @@ def admin_order_list(request):
     # Order by most recent first
     orders = orders.order_by('-created_at')
     
+    # Handle bulk status change (filters come from the query string, so
+    # "all matching" applies to exactly what the list shows)
+    if request.method == 'POST' and 'bulk_status' in request.POST:
+        bulk_form = BulkOrderStatusForm(request.POST)
+        if bulk_form.is_valid():
+            target = bulk_form.cleaned_data['target_status']
+            if bulk_form.cleaned_data['apply_to'] == BulkOrderStatusForm.APPLY_FILTERED:
+                selected = orders
+            else:
+                selected = bulk_form.cleaned_data['orders']
+            requested = selected.count()
+            updated = transition_orders(selected, target, actor=request.user)
+            
+            label = dict(Order.STATUS_CHOICES)[target]
+            if updated:
+                messages.success(request, f'Marked {len(updated)} order(s) as {label}.')
+            if requested > len(updated):
+                messages.warning(
+                    request,
+                    f'{requested - len(updated)} order(s) were skipped because they cannot move to {label} from their current status.'
+                )
+            return redirect(request.get_full_path())
+        for error in bulk_form.non_field_errors():
+            messages.error(request, error)
+        return redirect(request.get_full_path())
+    
     # Pagination
     paginator = Paginator(orders, 25)
     page_number = request.GET.get('page')
@@ -497,6 +565,7 @@ def admin_order_list(request):
         'selected_status': status_filter,
         'search_query': search_query,
         'status_choices': Order.STATUS_CHOICES,
+        'bulk_form': BulkOrderStatusForm(),
     }
     
     return render(request, 'admin_panel/admin_order_list.html', context)
@@ -509,15 +578,21 @@ def admin_order_detail(request, order_id):
     order_items = order.items.select_related('product').all()
     
     if request.method == 'POST':
-        form = OrderStatusUpdateForm(request.POST)
+        form = OrderStatusUpdateForm(request.POST, current_status=order.status)
         if form.is_valid():
             old_status = order.status
-            order.status = form.cleaned_data['status']
-            order.save()
-            messages.success(request, f'Order #{order.id} status updated from {old_status} to {order.status}.')
+            new_status = form.cleaned_data['status']
+            if new_status == old_status:
+                messages.info(request, f'Order #{order.id} is already {order.get_status_display()}.')
+            elif transition_orders(Order.objects.filter(pk=order.pk), new_status, actor=request.user):
+                # Conditional UPDATE guarded by the allowed source statuses;
+                # cancellation also restores stock
+                messages.success(request, f'Order #{order.id} status updated from {old_status} to {new_status}.')
+            else:
+                messages.error(request, f'Order #{order.id} changed status concurrently and can no longer move to {new_status}.')
             return redirect('admin_panel:admin_order_detail', order_id=order_id)
     else:
-        form = OrderStatusUpdateForm(initial={'status': order.status})
+        form = OrderStatusUpdateForm(initial={'status': order.status}, current_status=order.status)
     
     context = {
         'order': order,
@@ -536,19 +611,6 @@ def order_management(request):
     return redirect('admin_panel:orders')
 
 
-def _recalculate_product_rating(product):
-    """Recalculate and update product rating based on approved reviews"""
-    approved_reviews = Review.objects.filter(product=product, is_approved=True)
-    total_reviews = approved_reviews.count()
-    
-    if total_reviews > 0:
-        average_rating = sum(review.rating for review in approved_reviews) / total_reviews
-        product.rating = round(Decimal(str(average_rating)), 2)
-    else:
-        product.rating = Decimal('0.0')
-    product.save()
-
-
 @staff_required
 def review_management(request):
     """Review moderation and management view"""
@@ -582,66 +644,14 @@ def review_management(request):
         review_ids = request.POST.getlist('review_ids')
         
         if action == 'approve' and review_ids:
-            # Get products that need rating recalculation
-            products_to_update = set()
-            updated_count = 0
-            
-            for review_id in review_ids:
-                try:
-                    review = Review.objects.get(id=review_id)
-                    if not review.is_approved:
-                        review.is_approved = True
-                        review.save()
-                        products_to_update.add(review.product)
-                        updated_count += 1
-                        
-                        # Create audit log
-                        AuditLog.objects.create(
-                            actor=request.user,
-                            action='update',
-                            entity_type='Review',
-                            entity_id=str(review.id),
-                            summary=f'Approved review for {review.product.name}'
-                        )
-                except Review.DoesNotExist:
-                    pass
-            
-            # Recalculate ratings for affected products
-            for product in products_to_update:
-                _recalculate_product_rating(product)
-            
+            # One UPDATE for the reviews, one grouped aggregate for the ratings
+            updated_count = approve_reviews(review_ids, actor=request.user)
             messages.success(request, f'{updated_count} review(s) approved successfully.')
             return redirect('admin_panel:reviews')
         
         elif action == 'reject' and review_ids:
-            # For reject, we delete the review
-            products_to_update = set()
-            deleted_count = 0
-            
-            for review_id in review_ids:
-                try:
-                    review = Review.objects.get(id=review_id)
-                    product = review.product
-                    product_name = product.name
-                    products_to_update.add(product)
-                    
-                    # Create audit log before deleting
-                    AuditLog.objects.create(
-                        actor=request.user,
-                        action='delete',
-                        entity_type='Review',
-                        entity_id=str(review.id),
-                        summary=f'Rejected review for {product_name}'
-                    )
-                    review.delete()
-                    deleted_count += 1
-                except Review.DoesNotExist:
-                    pass
-            
-            # Recalculate ratings for affected products
-            for product in products_to_update:
-                _recalculate_product_rating(product)
-            
+            # For reject, we delete the reviews
+            deleted_count = reject_reviews(review_ids, actor=request.user)
             messages.success(request, f'{deleted_count} review(s) rejected and deleted.')
             return redirect('admin_panel:reviews')
     
@@ -676,20 +686,7 @@ def review_approve(request, review_id):
     review = get_object_or_404(Review, id=review_id)
     
     if not review.is_approved:
-        review.is_approved = True
-        review.save()
-        
-        # Recalculate product rating
-        _recalculate_product_rating(review.product)
-        
-        # Create audit log
-        AuditLog.objects.create(
-            actor=request.user,
-            action='update',
-            entity_type='Review',
-            entity_id=str(review.id),
-            summary=f'Approved review for {review.product.name}'
-        )
+        approve_reviews([review.id], actor=request.user)
         
         messages.success(request, f'Review for {review.product.name} has been approved.')
     else:
@@ -702,23 +699,10 @@ def review_approve(request, review_id):
 def review_reject(request, review_id):
     """Reject and delete a review"""
     review = get_object_or_404(Review, id=review_id)
-    product = review.product
-    product_name = product.name
-    review_id_str = str(review.id)
-    
-    # Create audit log before deleting
-    AuditLog.objects.create(
-        actor=request.user,
-        action='delete',
-        entity_type='Review',
-        entity_id=review_id_str,
-        summary=f'Rejected review for {product_name}'
-    )
+    product_name = review.product.name
     
-    review.delete()
-    
-    # Recalculate product rating
-    _recalculate_product_rating(product)
+    # Audit log is written before the review is deleted
+    reject_reviews([review.id], actor=request.user)
     
     messages.success(request, f'Review for {product_name} has been rejected and deleted.')
     return redirect('admin_panel:reviews')
@@ -771,6 +755,9 @@ def promotion_create(request):
         form = PromotionForm(request.POST)
         if form.is_valid():
             promotion = form.save()
+            # Effective prices of the promoted products may have changed
+            promotions = Promotion.objects.filter(pk=promotion.pk)
+            record_price_changes(Product.objects.filter(pk__in=promoted_product_ids(promotions)))
             # Create audit log
             AuditLog.objects.create(
                 actor=request.user,
@@ -804,7 +791,12 @@ def promotion_update(request, promotion_id):
     if request.method == 'POST':
         form = PromotionForm(request.POST, instance=promotion)
         if form.is_valid():
+            # Products dropped from the promotion change price as well as those added
+            promotions = Promotion.objects.filter(pk=promotion.pk)
+            affected = promoted_product_ids(promotions)
             form.save()
+            affected |= promoted_product_ids(promotions)
+            record_price_changes(Product.objects.filter(pk__in=affected))
             # Create audit log
             AuditLog.objects.create(
                 actor=request.user,
@@ -838,7 +830,9 @@ def promotion_delete(request, promotion_id):
     
     if request.method == 'POST':
         promotion_name = promotion.name
+        affected = promoted_product_ids(Promotion.objects.filter(pk=promotion.pk))
         promotion.delete()
+        record_price_changes(Product.objects.filter(pk__in=affected))
         # Create audit log
         AuditLog.objects.create(
             actor=request.user,
@@ -861,10 +855,12 @@ def promotion_delete(request, promotion_id):
 def chat_support(request):
     """Admin chat support management"""
     status_filter = request.GET.get('status', 'open')  # open, closed, all
+    sort = request.GET.get('sort', 'recent')  # recent, oldest_unanswered
     search_query = request.GET.get('q', '').strip()
     
-    # Base queryset
-    chat_sessions = ChatSession.objects.select_related('customer', 'customer__user', 'order').prefetch_related('messages').all()
+    # Base queryset; message counts, previews and waiting times are annotated
+    # per row, so the page is a single query
+    chat_sessions = with_queue_stats(ChatSession.objects.select_related('customer', 'customer__user', 'order'))
     
     # Apply status filter
     if status_filter == 'open':
@@ -881,13 +877,13 @@ def chat_support(request):
             Q(customer__user__email__icontains=search_query)
         )
     
-    # Order by most recent first
-    chat_sessions = chat_sessions.order_by('-updated_at')
-    
-    # Counts for status badges
-    open_count = ChatSession.objects.filter(status='open').count()
-    closed_count = ChatSession.objects.filter(status='closed').count()
-    total_count = ChatSession.objects.count()
+    if sort == 'oldest_unanswered':
+        # Longest-waiting first, served by chatsession_queue_idx within a status
+        # and by the partial chatsession_awaiting_idx when showing all
+        chat_sessions = chat_sessions.filter(awaiting_reply_since__isnull=False).order_by('awaiting_reply_since', 'id')
+    else:
+        # Order by most recent first
+        chat_sessions = chat_sessions.order_by('-updated_at')
     
     # Pagination
     paginator = Paginator(chat_sessions, 25)
@@ -897,10 +893,10 @@ def chat_support(request):
     context = {
         'page_obj': page_obj,
         'status_filter': status_filter,
+        'sort': sort,
         'search_query': search_query,
-        'open_count': open_count,
-        'closed_count': closed_count,
-        'total_count': total_count,
+        # Counts for status badges
+        **support_queue_counts(),
     }
     
     return render(request, 'admin_panel/chat_support.html', context)
@@ -917,36 +913,83 @@ def chat_detail_admin(request, session_id):
         
         if action == 'close':
             chat_session.status = 'closed'
-            chat_session.save()
+            chat_session.save(update_fields=['status', 'updated_at'])
             messages.success(request, 'Chat session closed.')
             return redirect('admin_panel:chat')
         
+        is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
         if message_text:
-            ChatMessage.objects.create(
+            # Also bumps the session's updated_at and unread count (storefront.signals)
+            chat_message = ChatMessage.objects.create(
                 session=chat_session,
                 sender='admin',
                 message=message_text
             )
-            chat_session.save()  # Update updated_at
+            if is_ajax:
+                return JsonResponse({'message': chat_message.serialize()}, status=201)
             messages.success(request, 'Message sent.')
             return redirect('admin_panel:chat_detail', session_id=session_id)
+        if is_ajax:
+            return JsonResponse({'error': 'Message is required.'}, status=400)
     
-    # Get all messages
-    messages_list = chat_session.messages.all().order_by('created_at')
+    # Only the latest page is rendered; earlier messages load on request
+    messages_list, earlier_cursor = transcript_page(chat_session.messages.all())
     
     return render(request, 'admin_panel/chat_detail.html', {
         'chat_session': chat_session,
         'messages_list': messages_list,
+        'earlier_cursor': earlier_cursor,
+        # New messages are streamed to the page from here on
+        'last_message_id': messages_list[-1].id if messages_list else 0,
+    })
+
+
+@staff_required
+def chat_messages_admin(request, session_id):
+    """
+    Return chat session messages as JSON: those posted after ``since_id``, or
+    with ``before`` the page of earlier messages ahead of that cursor
+    """
+    chat_session = get_object_or_404(ChatSession.objects.only('id'), id=session_id)
+    if 'before' in request.GET:
+        try:
+            page, earlier_cursor = transcript_page(chat_session.messages.all(), before=request.GET['before'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return JsonResponse({
+            'messages': [message.serialize() for message in page],
+            'earlier_cursor': earlier_cursor,
+        })
+    try:
+        since_id = parse_since_id(request.GET.get('since_id'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since_id.'}, status=400)
+    new_messages = [message.serialize() for message in messages_since(session_id, since_id)]
+    return JsonResponse({
+        'messages': new_messages,
+        'last_id': new_messages[-1]['id'] if new_messages else since_id,
     })
 
 
+@staff_required
+def chat_stream_admin(request, session_id):
+    """Push new messages in a chat session as server-sent events"""
+    get_object_or_404(ChatSession.objects.only('id'), id=session_id)
+    try:
+        since_id = parse_since_id(
+            request.headers.get('Last-Event-ID') or request.GET.get('since_id')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since_id.'}, status=400)
+    return chat_event_stream(request, session_id, since_id)
+
+
 # ============ DATA EXPORT ============
 
 @staff_required
 def import_export(request):
     """Data import/export view"""
     from django.http import HttpResponse
-    from django.db import transaction
     import csv
     import io
     from users.models import Customer
@@ -962,10 +1005,59 @@ def import_export(request):
             messages.error(request, 'Please select a CSV file to upload.')
             return render(request, 'admin_panel/data_export.html')
         
+        if import_type == 'carrier_manifest':
+            file_format = manifest_format(csv_file.name)
+            if file_format is None:
+                messages.error(request, 'Please upload a CSV or JSON lines manifest.')
+                return render(request, 'admin_panel/data_export.html')
+
+            # Manifests can run to 100k+ lines, so stream them in chunks
+            job = DataTransferJob.objects.create(
+                job_type='import',
+                target_model='Order status',
+                source_file_path=csv_file.name,
+                initiated_by=request.user,
+            )
+            try:
+                updated_count, errors = import_carrier_manifest(
+                    csv_file, job, actor=request.user, file_format=file_format
+                )
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error importing manifest: {str(e)}')
+                return redirect('admin_panel:import_export')
+
+            messages.success(request, f'Carrier manifest processed {job.rows_processed} row(s); updated {updated_count} order status(es).')
+            if errors.count:
+                messages.warning(request, f'{errors.count} row(s) could not be applied. See import job #{job.id} for details.')
+                for error in errors.messages[:5]:
+                    messages.error(request, error)
+            return redirect('admin_panel:import_export')
+
         if not csv_file.name.endswith('.csv'):
             messages.error(request, 'Please upload a CSV file.')
             return render(request, 'admin_panel/data_export.html')
-        
+
+        if import_type == 'stock_levels':
+            # Stocktake files can cover the whole catalogue, so stream them in chunks
+            job = DataTransferJob.objects.create(
+                job_type='import',
+                target_model='Product stock',
+                source_file_path=csv_file.name,
+                initiated_by=request.user,
+            )
+            try:
+                updated_count, errors = import_stock_levels(csv_file, job, actor=request.user)
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f'Error importing CSV: {str(e)}')
+                return redirect('admin_panel:import_export')
+
+            messages.success(request, f'Stocktake processed {job.rows_processed} row(s); updated stock for {updated_count} product(s).')
+            if errors.count:
+                messages.warning(request, f'{errors.count} row(s) could not be applied. See import job #{job.id} for details.')
+                for error in errors.messages[:5]:
+                    messages.error(request, error)
+            return redirect('admin_panel:import_export')
+
         try:
             # Read CSV file
             decoded_file = csv_file.read().decode('utf-8')
@@ -1105,7 +1197,11 @@ def import_export(request):
         
         elif export_type == 'orders':
             writer.writerow(['Order ID', 'Customer', 'Status', 'Total Price', 'Shipping Address', 'Created', 'Updated'])
-            orders = Order.objects.select_related('customer__user').all().order_by('-created_at')
+            # Exports cover full history, so the archive is included here
+            orders = chain(
+                Order.objects.select_related('customer__user').order_by('-created_at').iterator(),
+                ArchivedOrder.objects.select_related('customer__user').order_by('-created_at').iterator(),
+            )
             for order in orders:
                 writer.writerow([
                     order.id,
@@ -1474,10 +1570,35 @@ def aurora_chatbot_logs(request):
 
 @staff_required
 def aurora_chat_detail(request, session_id):
-    session = AiChatSession.objects.get(id=session_id)
+    session = get_object_or_404(AiChatSession.objects.select_related('customer__user'), id=session_id)
+    # Only the latest page is rendered; earlier messages load on request
+    transcript, earlier_cursor = transcript_page(session.messages.all(), 'timestamp')
+    stats = session.messages.aggregate(message_count=Count('id'), total_tokens=Sum('token_usage'))
     
     return render(request, "admin_panel/aurora_chat_detail.html", {
         "session": session,
+        "transcript": transcript,
+        "earlier_cursor": earlier_cursor,
+        "message_count": stats['message_count'],
+        # Replies plus the calls that summarised older turns
+        "total_tokens": (stats['total_tokens'] or 0) + session.summary_token_usage,
+        # The model that produced the latest message
+        "model_used": transcript[-1].model_used if transcript else None,
+    })
+
+@staff_required
+def aurora_chat_messages(request, session_id):
+    """Return the page of Aurora messages ahead of the ``before`` cursor as JSON"""
+    session = get_object_or_404(AiChatSession.objects.only('id'), id=session_id)
+    try:
+        page, earlier_cursor = transcript_page(
+            session.messages.all(), 'timestamp', before=request.GET.get('before')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'messages': [message.serialize() for message in page],
+        'earlier_cursor': earlier_cursor,
     })
 
 @staff_required
@@ -1485,7 +1606,8 @@ def make_chat_inactive(request, session_id):
     if request.method == "POST":
         session = AiChatSession.objects.get(id=session_id)
         session.is_active = False
-        session.save()
+        # Only these fields, so a summary written meanwhile is not overwritten
+        session.save(update_fields=['is_active', 'updated_at'])
     
         return redirect("admin_panel:aurora_chat_detail", session_id=session.id)
 
@@ -5,12 +5,24 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+The site is served with uvicorn (``uvicorn auroramart.asgi:application``), so
+one worker process can keep many support chat streams and Aurora replies open
+at once. Django still parks one thread per open request for its sync code,
+but the thread sits idle while the request waits; see
+``storefront.utils.chat``. As with ``runserver``, static files are served by
+Django itself only when DEBUG is on.
 """
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'auroramart.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
@@ -17,12 +17,27 @@ from dotenv import load_dotenv
 # Get Gemini API key from .env file
 load_dotenv()  # loads the .env file
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Point at a local stub (manage.py run_gemini_stub) for development and load tests
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+# Upper bound on one Aurora reply, including connecting and reading the response
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+# Estimated tokens of conversation history replayed verbatim in each Aurora prompt;
+# older turns are folded into a rolling summary capped at AURORA_SUMMARY_TOKEN_LIMIT
+AURORA_HISTORY_TOKEN_BUDGET = int(os.getenv("AURORA_HISTORY_TOKEN_BUDGET", 3000))
+AURORA_SUMMARY_TOKEN_LIMIT = int(os.getenv("AURORA_SUMMARY_TOKEN_LIMIT", 500))
 
 # Timezone
 TIME_ZONE = "UTC"
 USE_TZ = True
 SG_TIME_ZONE = "Asia/Singapore"
 
+# Delivered/cancelled orders older than this are moved to the archive tables by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 365))
+
+# Open support chats waiting longer than this for a staff reply are flagged as overdue
+CHAT_REPLY_SLA_MINUTES = int(os.getenv("CHAT_REPLY_SLA_MINUTES", 240))
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -1,3 +1,62 @@
 from django.db import models
 
-# Create your models here.
+
+class FieldTrackerMixin:
+    """
+    Remembers the database values of ``tracked_fields`` when an instance is loaded.
+
+    ``has_changed()``, ``previous()`` and ``changed_fields()`` compare against
+    that snapshot, so save signals can tell what changed without re-reading the
+    row. Foreign keys are tracked by attname (e.g. ``category_id``). Unsaved
+    instances report every tracked field as changed. The snapshot is refreshed
+    after ``save()`` and ``refresh_from_db()``, so it is still the pre-save
+    state while post_save handlers run.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self, fields=None):
+        snapshot = self.__dict__.setdefault('_tracked_values', {})
+        deferred = self.get_deferred_fields()
+        for name in self.tracked_fields if fields is None else fields:
+            if name not in self.tracked_fields or name in deferred:
+                continue
+            value = getattr(self, name)
+            # F() expressions are only resolved by the database
+            if hasattr(value, 'resolve_expression'):
+                snapshot.pop(name, None)
+            else:
+                snapshot[name] = value
+
+    def has_changed(self, name):
+        snapshot = self.__dict__.get('_tracked_values', {})
+        if name not in snapshot:
+            # A field that is still deferred was never loaded, so cannot have changed
+            return name not in self.get_deferred_fields()
+        return snapshot[name] != getattr(self, name)
+
+    def previous(self, name):
+        """The loaded value of ``name``, or None if it was not loaded."""
+        return self.__dict__.get('_tracked_values', {}).get(name)
+
+    def changed_fields(self, update_fields=None):
+        """Tracked fields that differ from the snapshot, limited to ``update_fields`` if given."""
+        return [
+            name for name in self.tracked_fields
+            if (update_fields is None or name in update_fields or name.removesuffix('_id') in update_fields)
+            and self.has_changed(name)
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._snapshot_tracked_fields(None if update_fields is None else list(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_tracked_fields(None if fields is None else list(fields))
@@ -0,0 +1,207 @@
+"""
+Token-budgeted conversation history for Aurora prompts.
+
+Recent turns are replayed verbatim while they fit in
+``AURORA_HISTORY_TOKEN_BUDGET``, after ``AiChatSession.history_summary``, a
+rolling summary of everything older. Building a prompt never calls the
+model: it only reads the stored summary and the newest turns that fit.
+
+Summaries are maintained off the request path. Once an exchange is stored,
+``schedule_fold`` queues the session on a background worker, which folds all
+but the newest half budget of unsummarised turns into the summary when they
+have outgrown the budget. Each update is written from the previous summary
+plus only the newly folded turns, so its cost does not grow with the
+conversation, and it happens about once per half budget of new
+conversation. Each prompt therefore carries at most the budget of verbatim
+history plus a summary capped at ``AURORA_SUMMARY_TOKEN_LIMIT``, however long
+the conversation runs.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from google.genai import errors as genai_errors
+import httpx
+
+from storefront.models import AiChatSession
+from .gemini_client import get_client, token_usage
+
+logger = logging.getLogger(__name__)
+
+# Messages read per query while walking back through the history
+HISTORY_FETCH_SIZE = 50
+
+SPEAKERS = {
+    'user': 'Shopper',
+    'bot': 'Aurora',
+}
+
+summary_instruction = (
+    "Update the running summary of a conversation between a shopper and Aurora, an e-commerce "
+    "shopping assistant, with the new turns below. Keep what later turns may depend on: products "
+    "and order numbers discussed, the shopper's preferences, and questions still open. Reply with "
+    "the updated summary only, in at most {words} words."
+)
+
+# One worker, so folds run one at a time and never race for the same session
+_fold_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aurora-summary')
+_pending_lock = threading.Lock()
+_pending_folds = set()
+
+
+def estimate_tokens(text):
+    """Rough token count for Gemini models (about four characters per token)."""
+    return len(text or '') // 4 + 1
+
+
+def truncate_to_tokens(text, limit):
+    """Cut ``text`` down to roughly ``limit`` tokens."""
+    max_chars = limit * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0] + ' ...'
+
+
+def _transcript(messages):
+    return "\n".join(f"{SPEAKERS.get(msg.sender, 'Shopper')}: {msg.content or ''}" for msg in messages)
+
+
+def _newest_unsummarized(session, limit):
+    """
+    The latest messages not yet folded into the summary, newest first, read
+    until they exceed ``limit`` estimated tokens. Returns ``(messages, overflowed)``.
+    """
+    history = (
+        session.messages.filter(id__gt=session.summary_through_id)
+        .order_by('-timestamp', '-id')
+        .only('id', 'sender', 'content')
+    )
+    newest_first = []
+    used = 0
+    for msg in history.iterator(chunk_size=HISTORY_FETCH_SIZE):
+        newest_first.append(msg)
+        used += estimate_tokens(msg.content)
+        if used > limit:
+            return newest_first, True
+    return newest_first, False
+
+
+def _within(newest_first, budget):
+    """The leading messages of ``newest_first`` that fit in ``budget`` estimated tokens."""
+    kept = []
+    used = 0
+    for msg in newest_first:
+        used += estimate_tokens(msg.content)
+        if used > budget:
+            break
+        kept.append(msg)
+    return kept
+
+
+def conversation_window(session, budget=None):
+    """
+    Return ``(summary, recent)`` to replay for ``session``.
+
+    ``recent`` holds the latest unsummarised messages that fit in ``budget``
+    estimated tokens, oldest first. Only reads the database; if a fold is
+    still pending, turns beyond the budget are left out of this prompt
+    rather than summarised here.
+    """
+    budget = budget or settings.AURORA_HISTORY_TOKEN_BUDGET
+    newest_first, _ = _newest_unsummarized(session, budget)
+    return session.history_summary, _within(newest_first, budget)[::-1]
+
+
+def digest_turns(previous_summary, messages, limit):
+    """
+    Summary built without calling the model: the previous summary plus one
+    shortened line per folded turn, dropping the oldest lines to fit ``limit``.
+    """
+    lines = [line for line in previous_summary.split("\n") if line]
+    lines += [
+        f"{SPEAKERS.get(msg.sender, 'Shopper')}: {truncate_to_tokens(' '.join((msg.content or '').split()), 40)}"
+        for msg in messages
+    ]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > limit:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), limit)
+
+
+def summarize_turns(previous_summary, messages, limit=None):
+    """
+    Fold ``messages`` (oldest first) into ``previous_summary``.
+
+    Returns ``(summary, usage)``, where ``usage`` is the billable tokens of
+    the model call. If the model cannot be reached the turns are digested
+    locally instead, at no token cost.
+    """
+    limit = limit or settings.AURORA_SUMMARY_TOKEN_LIMIT
+    prompt = (
+        summary_instruction.format(words=int(limit * 0.75)) +
+        f"\n---\nCURRENT SUMMARY:\n{previous_summary or '(none)'}"
+        f"\n---\nNEW TURNS:\n{_transcript(messages)}"
+    )
+    try:
+        response = get_client().models.generate_content(
+            model=settings.GEMINI_MODEL,
+            contents=[{"role": "user", "parts": [{"text": prompt}]}],
+        )
+    except (genai_errors.APIError, httpx.HTTPError):
+        return digest_turns(previous_summary, messages, limit), 0
+    summary = (response.text or '').strip()
+    if not summary:
+        return digest_turns(previous_summary, messages, limit), token_usage(response)
+    return truncate_to_tokens(summary, limit), token_usage(response)
+
+
+def fold_history(session_id, budget=None):
+    """
+    Fold older turns of a session into its summary once they outgrow ``budget``.
+
+    All but the newest half budget of unsummarised turns are folded. Walking
+    back stops a further budget beyond the window; anything older (only
+    possible for history that predates summaries) is dropped. The summary is
+    written only if no other fold moved it on meanwhile, and the summary
+    call's tokens are added to ``summary_token_usage``. Returns True if the
+    summary was updated.
+    """
+    budget = budget or settings.AURORA_HISTORY_TOKEN_BUDGET
+    session = AiChatSession.objects.only('id', 'history_summary', 'summary_through_id').get(pk=session_id)
+    newest_first, overflowed = _newest_unsummarized(session, budget * 2)
+    if not overflowed and sum(estimate_tokens(msg.content) for msg in newest_first) <= budget:
+        return False
+
+    folded = newest_first[len(_within(newest_first, budget // 2)):][::-1]
+    summary, usage = summarize_turns(session.history_summary, folded)
+    return bool(AiChatSession.objects.filter(
+        pk=session.pk, summary_through_id=session.summary_through_id,
+    ).update(
+        history_summary=summary,
+        summary_through_id=folded[-1].id,
+        summary_token_usage=F('summary_token_usage') + usage,
+    ))
+
+
+def _run_fold(session_id):
+    with _pending_lock:
+        _pending_folds.discard(session_id)
+    # The worker thread outlives requests, so manage its connection as a request would
+    close_old_connections()
+    try:
+        fold_history(session_id)
+    except Exception:
+        logger.exception('Summarising Aurora session %s failed', session_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_fold(session_id):
+    """Queue ``fold_history`` for a session on the background worker, once."""
+    with _pending_lock:
+        if session_id in _pending_folds:
+            return
+        _pending_folds.add(session_id)
+    _fold_executor.submit(_run_fold, session_id)
@@ -0,0 +1,60 @@
+"""
+Process-wide Gemini clients.
+
+Building a ``genai.Client`` sets up new HTTP connection pools, so clients are
+created once and shared: one for synchronous callers and one per event loop
+for async callers (pooled async connections cannot be used from another
+loop). Under ASGI there is a single loop, so every Aurora request shares one
+pool of keep-alive connections.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from google import genai
+from google.genai import types
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = {}
+
+
+def _new_client():
+    return genai.Client(
+        api_key=settings.GEMINI_API_KEY,
+        http_options=types.HttpOptions(
+            base_url=settings.GEMINI_BASE_URL,
+            timeout=int(settings.GEMINI_TIMEOUT_SECONDS * 1000),
+        ),
+    )
+
+
+def get_client():
+    """The shared synchronous Gemini client."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None:
+            _sync_client = _new_client()
+        return _sync_client
+
+
+def get_async_client():
+    """The shared async Gemini client (``client.aio``) for the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        # Loops that have finished (e.g. per-request loops under WSGI) can
+        # never use their client again
+        for closed in [other for other in _async_clients if other.is_closed()]:
+            del _async_clients[closed]
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = _new_client().aio
+        return client
+
+
+def token_usage(response):
+    """Billable tokens for a response: prompt plus candidates."""
+    usage = response.usage_metadata
+    if usage is None:
+        return 0
+    return (usage.prompt_token_count or 0) + (usage.candidates_token_count or 0)
@@ -1,8 +1,10 @@
-from storefront.models import Order, Product
+from storefront.models import Product
+from storefront.utils.orders import get_customer_order
 from .gemini_helpers.extract_primary_intent import extract_primary_intent
 from .gemini_helpers.extract_order_id import extract_order_id
 from .gemini_helpers.extract_product_names import extract_entities_from_catalog
 from .gemini_helpers.get_product_catalog import get_product_catalog
+from .conversation_memory import conversation_window
 
 system_persona = "You are Aurora, a friendly and concise e-commerce shopping assistant. Your goal is to answer questions only about products, shipping, and existing orders. If the question is outside these topics, politely redirect the user back to chat with human staff through the Support Chat Page."
 
@@ -24,19 +26,26 @@ def create_gemini_context(session , user_message_text):
             }
         ] 
 
-    # 2. Add Conversation History
+    # 2. Add Conversation History: a rolling summary of older turns, then the
+    # most recent turns verbatim, within AURORA_HISTORY_TOKEN_BUDGET
+    summary, recent_messages = conversation_window(session)
+    if summary:
+        context.append({
+            "role": "user",
+            "parts": [{"text": f"SUMMARY OF EARLIER CONVERSATION:\n{summary}"}]
+        })
+
     ROLE_MAP = {
         'user': 'user',
-        'assistant': 'model',  
-        'ai': 'model',         
+        'bot': 'model',
     }
-    for msg in session.messages.all():
+    for msg in recent_messages:
         # Map your Django sender roles to the Gemini API roles
         gemini_role = ROLE_MAP.get(msg.sender, 'user')
         
         context.append({
             "role": gemini_role,
-            "parts": [{"text": f"{msg.timestamp} {msg.content}"}]
+            "parts": [{"text": msg.content}]
         })
 
     # 3. Inject External Data -> order and product details if applicable
@@ -45,19 +54,15 @@ def create_gemini_context(session , user_message_text):
     if primary_intent in ('order_status', 'shipping'):
         order_id = extract_order_id(user_message_text)
         if order_id:
-            try:
-                order = Order.objects.get(pk=int(order_id), customer=session.customer)
-            except Order.DoesNotExist:
-                order = None
+            order = get_customer_order(session.customer, int(order_id))
         else:
             order = None
         
         # Create a detailed, factual prompt about the order
         if order:
-            order_items = [str(item) for item in order.items.all()]
             order_details_text = (
                 f"\nCURRENT ORDER CONTEXT: Order #{order.id}, Status: {order.status}, "
-                f"Items: {','.join(order_items)}, Shipping Address: {order.shipping_address}, Order Last Updated: {order.updated_at}. "
+                f"Items: {order.summary_text}, Shipping Address: {order.shipping_address}, Order Last Updated: {order.updated_at}. "
                 f"The user's query must be answered using this factual context."
             )
             # Prepend facts to the new user message
@@ -0,0 +1,120 @@
+"""
+A local stand-in for the Gemini ``generateContent`` and
+``streamGenerateContent`` endpoints.
+
+Replies after a configurable delay with a canned answer echoing the last
+user message, so Aurora can be exercised and load tested without network
+access or an API key. Streamed replies arrive a few words per chunk, and can
+be made to break off part way to exercise failure handling. Start it with
+``manage.py run_gemini_stub`` and set ``GEMINI_BASE_URL`` to its address.
+"""
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_MODEL_VERSION = 'gemini-stub'
+
+_ENDPOINT = re.compile(r'^/[^/]+/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)$')
+# Words per streamed chunk
+STREAM_CHUNK_WORDS = 3
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def stub_reply(contents):
+    """The reply text and usage metadata for a request's ``contents``."""
+    texts = [part.get('text', '') for content in contents for part in content.get('parts', [])]
+    question = texts[-1].rsplit('\n---\n', 1)[-1] if texts else ''
+    reply = f'This is a stub reply to: {question[:200]}'
+    return reply, {
+        'promptTokenCount': estimate_tokens(''.join(texts)),
+        'candidatesTokenCount': estimate_tokens(reply),
+        'totalTokenCount': estimate_tokens(''.join(texts)) + estimate_tokens(reply),
+    }
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Seconds to wait before replying, to stand in for model latency
+    delay = 1.0
+    # Seconds between streamed chunks
+    chunk_delay = 0.1
+    # Drop the connection after this many streamed chunks (None streams the whole reply)
+    fail_after = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        match = _ENDPOINT.match(self.path.split('?', 1)[0])
+        if not match:
+            return self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+        try:
+            contents = json.loads(body or b'{}').get('contents', [])
+        except ValueError:
+            return self._send_json(400, {'error': {'code': 400, 'message': 'Invalid JSON', 'status': 'INVALID_ARGUMENT'}})
+
+        time.sleep(self.delay)
+        reply, usage = stub_reply(contents)
+        if match['method'] == 'streamGenerateContent':
+            return self._send_stream(reply, usage)
+        self._send_json(200, {
+            'candidates': [{
+                'content': {'role': 'model', 'parts': [{'text': reply}]},
+                'finishReason': 'STOP',
+            }],
+            'usageMetadata': usage,
+            'modelVersion': STUB_MODEL_VERSION,
+        })
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, reply, usage):
+        words = reply.split(' ')
+        chunks = [
+            ' '.join(words[i:i + STREAM_CHUNK_WORDS]) + (' ' if i + STREAM_CHUNK_WORDS < len(words) else '')
+            for i in range(0, len(words), STREAM_CHUNK_WORDS)
+        ]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        # No length is known up front; the end of the stream is the end of the connection
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for index, text in enumerate(chunks):
+            if self.fail_after is not None and index >= self.fail_after:
+                break
+            chunk = {
+                'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}],
+                'modelVersion': STUB_MODEL_VERSION,
+            }
+            if index == len(chunks) - 1:
+                # Like the real API, the final chunk carries the finish reason and usage
+                chunk['candidates'][0]['finishReason'] = 'STOP'
+                chunk['usageMetadata'] = usage
+            self.wfile.write(f'data: {json.dumps(chunk)}\r\n\r\n'.encode())
+            self.wfile.flush()
+            time.sleep(self.chunk_delay)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_stub_server(host='127.0.0.1', port=8765, delay=1.0, chunk_delay=0.1, fail_after=None):
+    """Return a threaded stub server; call ``serve_forever()`` to run it."""
+    handler = type('ConfiguredGeminiStubHandler', (GeminiStubHandler,), {
+        'delay': delay,
+        'chunk_delay': chunk_delay,
+        'fail_after': fail_after,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import (
 	Category,
@@ -11,9 +12,20 @@ from .models import (
 	Promotion,
 	Watchlist,
 	WatchlistItem,
+	WatchlistNotification,
 	ChatSession,
 	ChatMessage,
+	StockMovement,
+	StockSnapshot,
+	PriceHistory,
+	ArchivedOrder,
+	ArchivedOrderItem,
 )
+from .utils.inventory import record_stock_movements
+from .utils.orders import refresh_order_summaries
+from .utils.pricing import promoted_product_ids, record_price_changes
+from .utils.eligibility import invalidate_eligibility
+from .utils.reviews import recalculate_product_ratings
 
 
 class OrderItemInline(admin.TabularInline):
@@ -26,6 +38,25 @@ class OrderAdmin(admin.ModelAdmin):
 	list_filter = ("status",)
 	search_fields = ("customer__user__username",)
 	inlines = (OrderItemInline,)
+	readonly_fields = ("item_count", "summary")
+
+	def save_related(self, request, form, formsets, change):
+		super().save_related(request, form, formsets, change)
+		# Covers inline item deletions, which do not send a summary refresh
+		refresh_order_summaries([form.instance.pk])
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+	model = ArchivedOrderItem
+	extra = 0
+	raw_id_fields = ("product",)
+
+
+class ArchivedOrderAdmin(admin.ModelAdmin):
+	list_display = ("id", "customer", "status", "total_price", "created_at", "archived_at")
+	list_filter = ("status",)
+	search_fields = ("id", "customer__user__username")
+	inlines = (ArchivedOrderItemInline,)
 
 
 class CartItemInline(admin.TabularInline):
@@ -48,18 +79,90 @@ class ProductAdmin(admin.ModelAdmin):
 	list_filter = ("is_active", "archived", "category")
 	search_fields = ("sku", "name")
 
+	def save_model(self, request, obj, form, change):
+		# Keep the stock ledger complete for edits made through the Django admin
+		with transaction.atomic():
+			super().save_model(request, obj, form, change)
+			if not change:
+				record_stock_movements({obj.pk: obj.stock}, "initial", actor=request.user)
+			elif "stock" in form.changed_data:
+				record_stock_movements(
+					{obj.pk: obj.stock - form.initial["stock"]}, "admin_edit", actor=request.user
+				)
+
+
+class StockMovementAdmin(admin.ModelAdmin):
+	list_display = ("product", "delta", "reason", "reference", "actor", "created_at")
+	list_filter = ("reason",)
+	search_fields = ("product__sku", "reference")
+	list_select_related = ("product", "actor")
+	raw_id_fields = ("product", "actor")
+
+
+class StockSnapshotAdmin(admin.ModelAdmin):
+	list_display = ("product", "stock", "movement_watermark", "taken_at")
+	search_fields = ("product__sku",)
+	list_select_related = ("product",)
+	raw_id_fields = ("product",)
+
+
+class PriceHistoryAdmin(admin.ModelAdmin):
+	list_display = ("product", "price", "effective_price", "valid_from")
+	search_fields = ("product__sku", "product__name")
+	raw_id_fields = ("product",)
+	list_select_related = ("product",)
+
 
 class ReviewAdmin(admin.ModelAdmin):
 	list_display = ("product", "customer", "rating", "is_approved", "created_at")
 	list_filter = ("is_approved", "rating")
 	search_fields = ("product__name", "customer__user__username")
 
+	# Ratings and histograms are stored on Product, so refresh them on every change
+	def save_model(self, request, obj, form, change):
+		super().save_model(request, obj, form, change)
+		product_ids = {obj.product_id}
+		if form.initial.get("product"):
+			# The review may have been moved off another product
+			product_ids.add(form.initial["product"])
+		recalculate_product_ratings(product_ids)
+
+	def delete_model(self, request, obj):
+		super().delete_model(request, obj)
+		recalculate_product_ratings([obj.product_id])
+		invalidate_eligibility([obj.customer_id])
+
+	def delete_queryset(self, request, queryset):
+		rows = list(queryset.values_list("product_id", "customer_id"))
+		super().delete_queryset(request, queryset)
+		recalculate_product_ratings(product_id for product_id, _ in rows)
+		invalidate_eligibility(customer_id for _, customer_id in rows)
+
 
 class PromotionAdmin(admin.ModelAdmin):
 	list_display = ("name", "discount_percent", "start_date", "end_date", "is_active")
 	list_filter = ("is_active",)
 	search_fields = ("name",)
 
+	# Promotions change the effective prices of the products they cover, before
+	# and after the edit; products are attached in save_related
+	def save_related(self, request, form, formsets, change):
+		promotions = Promotion.objects.filter(pk=form.instance.pk)
+		affected = promoted_product_ids(promotions) if change else set()
+		super().save_related(request, form, formsets, change)
+		affected |= promoted_product_ids(promotions)
+		record_price_changes(Product.objects.filter(pk__in=affected))
+
+	def delete_model(self, request, obj):
+		affected = promoted_product_ids(Promotion.objects.filter(pk=obj.pk))
+		super().delete_model(request, obj)
+		record_price_changes(Product.objects.filter(pk__in=affected))
+
+	def delete_queryset(self, request, queryset):
+		affected = promoted_product_ids(queryset)
+		super().delete_queryset(request, queryset)
+		record_price_changes(Product.objects.filter(pk__in=affected))
+
 
 class WatchlistItemInline(admin.TabularInline):
 	model = WatchlistItem
@@ -71,6 +174,13 @@ class WatchlistAdmin(admin.ModelAdmin):
 	inlines = (WatchlistItemInline,)
 
 
+class WatchlistNotificationAdmin(admin.ModelAdmin):
+	list_display = ("customer", "product", "kind", "previous_price", "price", "created_at", "sent_at")
+	list_filter = ("kind",)
+	search_fields = ("customer__user__username", "product__name")
+	raw_id_fields = ("customer", "product")
+
+
 class ChatMessageInline(admin.TabularInline):
 	model = ChatMessage
 	extra = 0
@@ -92,6 +202,11 @@ admin.site.register(CartItem)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(Promotion, PromotionAdmin)
 admin.site.register(Watchlist, WatchlistAdmin)
+admin.site.register(WatchlistNotification, WatchlistNotificationAdmin)
 admin.site.register(WatchlistItem)
 admin.site.register(ChatSession, ChatSessionAdmin)
 admin.site.register(ChatMessage)
+admin.site.register(ArchivedOrder, ArchivedOrderAdmin)
+admin.site.register(StockMovement, StockMovementAdmin)
+admin.site.register(StockSnapshot, StockSnapshotAdmin)
+admin.site.register(PriceHistory, PriceHistoryAdmin)
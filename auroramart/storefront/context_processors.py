@@ -1,6 +1,7 @@
 from django.db.models import Count
 from datetime import date
-from .models import Category, Product, Cart, Watchlist, Promotion
+from .models import Category, Product, Cart, Promotion
+from .utils.watchlist import watchlist_product_ids
 
 
 def categories_with_products(request):
@@ -112,19 +113,13 @@ def cart_count(request):
 
 def watchlist_count(request):
     """
-    Context processor to provide watchlist item count for badge in navigation.
+    Context processor to provide watchlist item count for badge in navigation,
+    and the watched product ids so product cards can show their watchlist state.
     Only works for authenticated users with customer profiles.
     """
-    count = 0
-    
-    if request.user.is_authenticated and hasattr(request.user, 'customer_profile'):
-        try:
-            watchlist = Watchlist.objects.get(customer=request.user.customer_profile)
-            count = watchlist.items.count()
-        except Watchlist.DoesNotExist:
-            count = 0
+    product_ids = watchlist_product_ids(request)
     
     return {
-        'watchlist_count': count
+        'watchlist_count': len(product_ids),
+        'watchlist_product_ids': product_ids,
     }
-
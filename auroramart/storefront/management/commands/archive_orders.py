@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from storefront.utils.orders import archivable_orders, archive_order_batch
+
+
+class Command(BaseCommand):
+	help = 'Move delivered and cancelled orders older than the archive age into the archive tables'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--days',
+			type=int,
+			default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+			help='Archive final-state orders created more than this many days ago'
+		)
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=1000,
+			help='Number of orders moved per transaction'
+		)
+		parser.add_argument(
+			'--dry-run',
+			action='store_true',
+			help='Only report how many orders would be archived'
+		)
+
+	def handle(self, *args, **options):
+		cutoff = timezone.now() - timedelta(days=options['days'])
+
+		if options['dry_run']:
+			count = archivable_orders(cutoff).count()
+			self.stdout.write(f'{count} order(s) created before {cutoff:%Y-%m-%d} would be archived.')
+			return
+
+		archived = 0
+		while True:
+			moved = archive_order_batch(cutoff, batch_size=options['batch_size'])
+			if not moved:
+				break
+			archived += moved
+			self.stdout.write(f'Archived {archived} orders...')
+
+		self.stdout.write(self.style.SUCCESS(f'Archive completed: {archived} order(s) moved.'))
@@ -5,7 +5,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 
-from storefront.models import Category, Product
+from storefront.models import Category, Product, StockMovement
 
 
 class Command(BaseCommand):
@@ -36,6 +36,10 @@ class Command(BaseCommand):
 		products_created = 0
 		products_updated = 0
 		
+		# Current levels, so stock changes can be written to the ledger in one insert
+		existing_stock = dict(Product.objects.values_list('sku', 'stock'))
+		movements = []
+		
 		with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
 			reader = csv.DictReader(f)
 			
@@ -97,6 +101,18 @@ class Command(BaseCommand):
 					products_created += 1
 				else:
 					products_updated += 1
+				
+				delta = stock - existing_stock.get(sku, 0)
+				if delta:
+					movements.append(StockMovement(
+						product=product,
+						delta=delta,
+						reason='initial' if created else 'import',
+						reference=os.path.basename(file_path),
+					))
+				existing_stock[sku] = stock
+		
+		StockMovement.objects.bulk_create(movements, batch_size=1000)
 		
 		self.stdout.write(self.style.SUCCESS(
 			f'\nImport completed successfully!\n'
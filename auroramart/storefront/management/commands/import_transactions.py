@@ -133,29 +133,28 @@ class Command(BaseCommand):
 					k=1
 				)[0]
 				
+				# Build the items first so the order is inserted with its total and
+				# denormalised summary, then insert the items in one statement
+				order_items = [
+					OrderItem(product=product, quantity=quantity, unit_price=product.price)
+					for product, quantity in products_in_basket
+				]
+				item_count, summary = Order.build_summary(order_items)
 				order = Order.objects.create(
 					customer=customer,
 					status=status,
 					created_at=order_date,
-					shipping_address=f'{random.randint(1, 999)} Main Street, Singapore {random.randint(100000, 999999)}'
+					shipping_address=f'{random.randint(1, 999)} Main Street, Singapore {random.randint(100000, 999999)}',
+					total_price=sum(
+						(item.unit_price * item.quantity for item in order_items), Decimal('0.00')
+					),
+					item_count=item_count,
+					summary=summary
 				)
-				
-				# Create order items
-				total_price = Decimal('0.00')
-				for product, quantity in products_in_basket:
-					unit_price = product.price
-					OrderItem.objects.create(
-						order=order,
-						product=product,
-						quantity=quantity,
-						unit_price=unit_price
-					)
-					total_price += unit_price * quantity
-					order_items_created += 1
-				
-				# Update order total
-				order.total_price = total_price
-				order.save()
+				for item in order_items:
+					item.order = order
+				OrderItem.objects.bulk_create(order_items)
+				order_items_created += len(order_items)
 				
 				orders_created += 1
 				
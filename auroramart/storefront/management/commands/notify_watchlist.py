@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from storefront.utils.watchlist import (
+	NOTIFICATION_BATCH_SIZE,
+	WATCHLIST_BATCH_SIZE,
+	notify_watchlist_changes,
+	send_watchlist_notifications,
+)
+
+
+class Command(BaseCommand):
+	help = 'Queue price-drop and back-in-stock notifications for watchlisted products, and optionally mail them'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=WATCHLIST_BATCH_SIZE,
+			help='Number of watchlist items to diff per query'
+		)
+		parser.add_argument(
+			'--send',
+			action='store_true',
+			help='Mail pending notifications after queueing new ones'
+		)
+
+	def handle(self, *args, **options):
+		notified, refreshed = notify_watchlist_changes(batch_size=options['batch_size'])
+		self.stdout.write(
+			self.style.SUCCESS(
+				f'Queued {notified} notification(s); {refreshed} watchlist snapshot(s) updated.'
+			)
+		)
+
+		if options['send']:
+			sent, emails = send_watchlist_notifications(batch_size=NOTIFICATION_BATCH_SIZE)
+			self.stdout.write(self.style.SUCCESS(f'Sent {sent} notification(s) in {emails} email(s).'))
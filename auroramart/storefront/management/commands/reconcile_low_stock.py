@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from storefront.utils.inventory import reconcile_low_stock_flags
+
+
+class Command(BaseCommand):
+	help = 'Recompute the maintained is_low_stock flag for every product and repair any drift'
+
+	def handle(self, *args, **options):
+		flagged, cleared = reconcile_low_stock_flags()
+
+		if flagged or cleared:
+			self.stdout.write(self.style.WARNING(
+				f'Repaired low-stock flags: {flagged} product(s) flagged, {cleared} product(s) cleared.'
+			))
+		else:
+			self.stdout.write(self.style.SUCCESS('Low-stock flags are consistent with stock levels.'))
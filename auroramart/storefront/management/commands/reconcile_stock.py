@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from storefront.utils.inventory import stock_drift
+
+
+class Command(BaseCommand):
+	help = 'Compare every product\'s stock with its latest snapshot plus later ledger movements'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--limit',
+			type=int,
+			default=50,
+			help='Maximum number of drifted products to list'
+		)
+
+	def handle(self, *args, **options):
+		drifted = list(
+			stock_drift()
+			.order_by('sku')
+			.values_list('sku', 'name', 'stock', 'expected_stock', 'drift')
+		)
+
+		if not drifted:
+			self.stdout.write(self.style.SUCCESS('Stock levels match the ledger for every product.'))
+			return
+
+		for sku, name, stock, expected, drift in drifted[:options['limit']]:
+			self.stdout.write(f'{sku} {name}: stock {stock}, ledger {expected} ({drift:+d})')
+		if len(drifted) > options['limit']:
+			self.stdout.write(f'... and {len(drifted) - options["limit"]} more')
+
+		self.stdout.write(self.style.WARNING(f'{len(drifted)} product(s) have drifted from the stock ledger.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from storefront.utils.pricing import record_price_changes
+
+
+class Command(BaseCommand):
+	help = 'Append price history rows for products whose list or effective price has changed (run daily so promotion start and end dates are captured)'
+
+	def handle(self, *args, **options):
+		written = record_price_changes()
+		self.stdout.write(self.style.SUCCESS(f'Recorded {written} price change(s).'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from mlservices.gemini_stub import make_stub_server
+
+
+class Command(BaseCommand):
+	help = 'Serve a local stub of the Gemini API for developing and load testing Aurora'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+		parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+		parser.add_argument(
+			'--delay',
+			type=float,
+			default=1.0,
+			help='Seconds to wait before each reply, to simulate model latency'
+		)
+		parser.add_argument(
+			'--chunk-delay',
+			type=float,
+			default=0.1,
+			help='Seconds between chunks of a streamed reply'
+		)
+		parser.add_argument(
+			'--fail-after',
+			type=int,
+			default=None,
+			help='Drop streamed replies after this many chunks, to test failure handling'
+		)
+
+	def handle(self, *args, **options):
+		server = make_stub_server(
+			options['host'],
+			options['port'],
+			delay=options['delay'],
+			chunk_delay=options['chunk_delay'],
+			fail_after=options['fail_after'],
+		)
+		host, port = server.server_address[:2]
+		self.stdout.write(
+			self.style.SUCCESS(
+				f'Gemini stub listening on http://{host}:{port}/ '
+				f'(set GEMINI_BASE_URL=http://{host}:{port}/ to use it)'
+			)
+		)
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			server.server_close()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from storefront.utils.inventory import stock_drift, take_stock_snapshot
+
+
+class Command(BaseCommand):
+	help = 'Record a point-in-time stock snapshot so reconciliation only has to sum later movements'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--force',
+			action='store_true',
+			help='Snapshot even if stock has drifted from the ledger (accepts current stock as correct)'
+		)
+
+	def handle(self, *args, **options):
+		# A snapshot of drifted stock would hide the drift from later reconciliations
+		drifted = stock_drift().count()
+		if drifted and not options['force']:
+			self.stdout.write(self.style.ERROR(
+				f'{drifted} product(s) have drifted from the stock ledger. '
+				f'Run reconcile_stock to review them, or pass --force to snapshot anyway.'
+			))
+			return
+
+		count = take_stock_snapshot()
+		self.stdout.write(self.style.SUCCESS(f'Snapshot recorded for {count} product(s).'))
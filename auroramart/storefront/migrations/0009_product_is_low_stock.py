@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:23
+
+from django.db import migrations, models
+
+
+def populate_low_stock(apps, schema_editor):
+    Product = apps.get_model('storefront', 'Product')
+    Product.objects.filter(stock__lte=models.F('reorder_threshold')).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0008_alter_aichatmessage_sender'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(populate_low_stock, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('archived', False), ('is_low_stock', True)), fields=['stock', 'name'], name='product_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def snapshot_existing_stock(apps, schema_editor):
+    # Baseline so current stock reconciles against an empty ledger
+    Product = apps.get_model('storefront', 'Product')
+    StockSnapshot = apps.get_model('storefront', 'StockSnapshot')
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(product_id=pk, stock=stock, movement_watermark=0)
+            for pk, stock in Product.objects.values_list('pk', 'stock').iterator()
+        ],
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('storefront', '0009_product_is_low_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('movement_watermark', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='storefront.product')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='stocksnapshot_product_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Initial Stock'), ('checkout', 'Checkout'), ('cancellation', 'Cancellation'), ('admin_edit', 'Admin Edit'), ('bulk_adjust', 'Bulk Adjustment'), ('stocktake', 'Stocktake Import'), ('import', 'Catalogue Import')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='storefront.product')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'id'], name='stockmovement_product_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_stock, reverse_code=migrations.RunPython.noop),
+    ]
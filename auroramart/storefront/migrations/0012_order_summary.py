@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:29
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+SUMMARY_LINES = 3
+
+
+def populate_order_summaries(apps, schema_editor):
+    Order = apps.get_model('storefront', 'Order')
+    OrderItem = apps.get_model('storefront', 'OrderItem')
+
+    items = (
+        OrderItem.objects.order_by('order_id', 'id')
+        .values_list('order_id', 'quantity', 'unit_price', 'product__name')
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for order_id, rows in groupby(items, key=lambda row: row[0]):
+        rows = list(rows)
+        summary = {
+            'lines': [
+                {'name': name, 'quantity': quantity, 'unit_price': str(unit_price)}
+                for _, quantity, unit_price, name in rows[:SUMMARY_LINES]
+            ],
+            'units': sum(quantity for _, quantity, _, _ in rows),
+        }
+        batch.append(Order(pk=order_id, item_count=len(rows), summary=summary))
+        if len(batch) >= 1000:
+            Order.objects.bulk_update(batch, ['item_count', 'summary'])
+            batch = []
+    Order.objects.bulk_update(batch, ['item_count', 'summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0011_product_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(populate_order_summaries, reverse_code=migrations.RunPython.noop),
+    ]
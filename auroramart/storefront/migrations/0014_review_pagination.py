@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:43
+
+from itertools import groupby
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_rating_histograms(apps, schema_editor):
+    Product = apps.get_model('storefront', 'Product')
+    Review = apps.get_model('storefront', 'Review')
+
+    counts = (
+        Review.objects.filter(is_approved=True)
+        .values('product_id', 'rating')
+        .annotate(count=Count('id'))
+        .order_by('product_id', 'rating')
+        .values_list('product_id', 'rating', 'count')
+    )
+    batch = []
+    for product_id, rows in groupby(counts, key=lambda row: row[0]):
+        histogram = {str(rating): count for _, rating, count in rows}
+        batch.append(Product(pk=product_id, rating_histogram=histogram))
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['rating_histogram'])
+            batch = []
+    Product.objects.bulk_update(batch, ['rating_histogram'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0013_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_histogram',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['product', '-created_at', '-id'], name='review_product_recent_idx'),
+        ),
+        migrations.RunPython(populate_rating_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_customer_preferred_category'),
+        ('storefront', '0014_review_pagination'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watchlistitem',
+            name='snapshot_in_stock',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='watchlistitem',
+            name='snapshot_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='WatchlistNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('price_drop', 'Price Drop'), ('back_in_stock', 'Back in Stock')], max_length=20)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watchlist_notifications', to='users.customer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='storefront.product')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['customer', 'id'], name='watchnotif_pending_idx')],
+            },
+        ),
+    ]
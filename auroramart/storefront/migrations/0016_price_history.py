@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_price_history(apps, schema_editor):
+    # Promotions are not applied here; the first record_price_history run adds
+    # a row for every product that is currently discounted
+    Product = apps.get_model('storefront', 'Product')
+    PriceHistory = apps.get_model('storefront', 'PriceHistory')
+
+    now = django.utils.timezone.now()
+    batch = []
+    for product_id, price in Product.objects.values_list('pk', 'price').iterator(chunk_size=2000):
+        batch.append(PriceHistory(product_id=product_id, price=price, effective_price=price, valid_from=now))
+        if len(batch) >= 1000:
+            PriceHistory.objects.bulk_create(batch)
+            batch = []
+    PriceHistory.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0015_watchlist_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('effective_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('valid_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='storefront.product')),
+            ],
+            options={
+                'verbose_name_plural': 'price history',
+                'ordering': ['-valid_from'],
+                'indexes': [models.Index(fields=['product', 'valid_from'], name='pricehistory_product_idx')],
+            },
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
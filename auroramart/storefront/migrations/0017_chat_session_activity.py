@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:50
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_chat_activity(apps, schema_editor):
+    ChatSession = apps.get_model('storefront', 'ChatSession')
+    ChatMessage = apps.get_model('storefront', 'ChatMessage')
+
+    def latest(sender):
+        return Subquery(
+            ChatMessage.objects.filter(session=OuterRef('pk'), sender=sender)
+            .order_by().values('session').annotate(latest=Max('created_at')).values('latest')
+        )
+
+    def admin_count(**filters):
+        return Coalesce(Subquery(
+            ChatMessage.objects.filter(session=OuterRef('pk'), sender='admin', **filters)
+            .order_by().values('session').annotate(total=Count('id')).values('total')
+        ), 0)
+
+    ChatSession.objects.update(
+        last_customer_message_at=latest('customer'),
+        last_admin_message_at=latest('admin'),
+    )
+    # Customers who never replied have every admin message unread
+    ChatSession.objects.filter(last_customer_message_at__isnull=True).update(
+        unread_for_customer=admin_count(),
+    )
+    ChatSession.objects.filter(last_customer_message_at__isnull=False).update(
+        unread_for_customer=admin_count(created_at__gt=OuterRef('last_customer_message_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0016_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_admin_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_customer_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='unread_for_customer',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_chat_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0017_chat_session_activity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'id'], name='chatmsg_session_id_idx'),
+        ),
+    ]
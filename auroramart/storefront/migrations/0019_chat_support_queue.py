@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:54
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def populate_awaiting_reply(apps, schema_editor):
+    ChatSession = apps.get_model('storefront', 'ChatSession')
+    ChatMessage = apps.get_model('storefront', 'ChatMessage')
+
+    def oldest_customer_message(**filters):
+        return Subquery(
+            ChatMessage.objects.filter(session=OuterRef('pk'), sender='customer', **filters)
+            .order_by().values('session').annotate(oldest=Min('created_at')).values('oldest')
+        )
+
+    # Sessions whose latest message is from the customer are waiting on staff
+    ChatSession.objects.filter(
+        last_customer_message_at__isnull=False, last_admin_message_at__isnull=True,
+    ).update(awaiting_reply_since=oldest_customer_message())
+    ChatSession.objects.filter(
+        last_customer_message_at__gt=models.F('last_admin_message_at'),
+    ).update(awaiting_reply_since=oldest_customer_message(
+        created_at__gt=OuterRef('last_admin_message_at'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0018_chat_message_since_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='awaiting_reply_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['status', 'awaiting_reply_since', 'id'], name='chatsession_queue_idx'),
+        ),
+        migrations.RunPython(populate_awaiting_reply, migrations.RunPython.noop),
+    ]
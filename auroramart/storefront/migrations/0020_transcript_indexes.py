@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0019_chat_support_queue'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aichatmessage',
+            index=models.Index(fields=['session', 'timestamp', 'id'], name='aichatmsg_session_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+        ),
+    ]
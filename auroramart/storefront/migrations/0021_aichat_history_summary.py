@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0020_transcript_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichatsession',
+            name='history_summary',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='aichatsession',
+            name='summary_through_id',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='aichatsession',
+            name='summary_token_usage',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+    ]
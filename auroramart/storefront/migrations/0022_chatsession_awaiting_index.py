@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storefront', '0021_aichat_history_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(condition=models.Q(('awaiting_reply_since__isnull', False)), fields=['awaiting_reply_since', 'id'], name='chatsession_awaiting_idx'),
+        ),
+    ]
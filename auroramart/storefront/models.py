@@ -1,6 +1,10 @@
 from decimal import Decimal
 
+from django.conf import settings
 from django.db import models
+from django.utils import dateformat, timezone
+
+from core.models import FieldTrackerMixin
 
 from users.models import Customer
 
@@ -33,7 +37,7 @@ class Category(models.Model):
 			archived=False
 		)
 
-class Product(models.Model):
+class Product(FieldTrackerMixin, models.Model):
 	"""Backs US001-US004 and ADM001-ADM004 with catalogue, pricing, rating, and inventory data."""
 	sku = models.CharField(max_length=30, unique=True)
 	name = models.CharField(max_length=150)
@@ -41,21 +45,181 @@ class Product(models.Model):
 	category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
 	price = models.DecimalField(max_digits=10, decimal_places=2)
 	rating = models.DecimalField(max_digits=3, decimal_places=1, default=Decimal('0.0'))
+	# Approved review counts keyed by star rating ("1".."5"), kept alongside rating
+	# by storefront.utils.reviews.recalculate_product_ratings
+	rating_histogram = models.JSONField(default=dict, blank=True, editable=False)
 	stock = models.PositiveIntegerField(default=0)
 	reorder_threshold = models.PositiveIntegerField(default=0)
+	# Maintained copy of stock <= reorder_threshold so low-stock reads can use an index
+	is_low_stock = models.BooleanField(default=False, editable=False)
+	# Bumped on every write; admin edits compare-and-swap against it to detect lost updates
+	version = models.PositiveIntegerField(default=1, editable=False)
 	is_active = models.BooleanField(default=True)
 	archived = models.BooleanField(default=False)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	tracked_fields = (
+		'sku', 'name', 'description', 'category_id', 'price', 'rating',
+		'stock', 'reorder_threshold', 'is_active', 'archived',
+	)
+
 	class Meta:
 		ordering = ['name']
+		indexes = [
+			models.Index(
+				fields=['stock', 'name'],
+				name='product_low_stock_idx',
+				condition=models.Q(is_low_stock=True, archived=False),
+			),
+		]
 
 	def __str__(self):
 		return f"{self.sku} - {self.name}"
 
+	@property
+	def approved_review_count(self):
+		return sum(self.rating_histogram.values())
+
+	def rating_distribution(self):
+		"""``(stars, count, percent)`` for 5 stars down to 1, for the review summary widget."""
+		total = self.approved_review_count
+		return [
+			(stars, count, round(count * 100 / total) if total else 0)
+			for stars, count in (
+				(stars, self.rating_histogram.get(str(stars), 0)) for stars in range(5, 0, -1)
+			)
+		]
+
+	def save(self, *args, **kwargs):
+		self.is_low_stock = self.stock <= self.reorder_threshold
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None:
+			update_fields = {*update_fields, 'version'}
+			if {'stock', 'reorder_threshold'} & update_fields:
+				update_fields.add('is_low_stock')
+			kwargs['update_fields'] = update_fields
+
+		if self._state.adding:
+			return super().save(*args, **kwargs)
+
+		# Increment in SQL so a stale instance cannot reuse a version number.
+		# The instance then holds the version it was loaded at plus one, without
+		# re-reading the row: if it was stale that is behind the database, so a
+		# later compare-and-swap from it fails rather than overwriting.
+		expected = self.__dict__.get('version')
+		self.version = models.F('version') + 1
+		super().save(*args, **kwargs)
+		if expected is None:
+			# version was deferred; leave it to load on access
+			del self.__dict__['version']
+		else:
+			self.version = expected + 1
+
+
+class StockMovement(models.Model):
+	"""Append-only ledger of every change to Product.stock, supporting ADM003 inventory reconciliation."""
+	REASON_CHOICES = [
+		('initial', 'Initial Stock'),
+		('checkout', 'Checkout'),
+		('cancellation', 'Cancellation'),
+		('admin_edit', 'Admin Edit'),
+		('bulk_adjust', 'Bulk Adjustment'),
+		('stocktake', 'Stocktake Import'),
+		('import', 'Catalogue Import'),
+	]
+
+	# Covered by the (product, id) index below
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements', db_index=False)
+	delta = models.IntegerField()
+	reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+	reference = models.CharField(max_length=64, blank=True)
+	actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['-id']
+		indexes = [
+			models.Index(fields=['product', 'id'], name='stockmovement_product_idx'),
+		]
 
-class Order(models.Model):
+	def __str__(self):
+		return f"{self.delta:+d} {self.product_id} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+	"""Periodic point-in-time stock level; current stock should equal the latest snapshot plus later movements."""
+	# Covered by the (product, id) index below
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots', db_index=False)
+	stock = models.IntegerField()
+	# Highest StockMovement id already reflected in ``stock``
+	movement_watermark = models.BigIntegerField(default=0)
+	taken_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['-id']
+		indexes = [
+			models.Index(fields=['product', 'id'], name='stocksnapshot_product_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.product_id}: {self.stock} @ {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class PriceHistory(models.Model):
+	"""List and effective (after promotion) price of a product from ``valid_from`` until its next row."""
+	# Covered by the (product, valid_from) index below
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history', db_index=False)
+	price = models.DecimalField(max_digits=10, decimal_places=2)
+	effective_price = models.DecimalField(max_digits=10, decimal_places=2)
+	valid_from = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		ordering = ['-valid_from']
+		verbose_name_plural = 'price history'
+		indexes = [
+			models.Index(fields=['product', 'valid_from'], name='pricehistory_product_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.product_id}: {self.effective_price} from {self.valid_from:%Y-%m-%d %H:%M}"
+
+
+class OrderSummaryMixin:
+	"""Shared helpers for the denormalised ``item_count``/``summary`` fields on live and archived orders."""
+	# Number of line items kept in the denormalised summary
+	SUMMARY_LINES = 3
+
+	@classmethod
+	def build_summary(cls, items):
+		"""Return ``(item_count, summary)`` for OrderItems whose products are loaded."""
+		items = list(items)
+		summary = {
+			'lines': [
+				{
+					'name': item.product.name,
+					'quantity': item.quantity,
+					'unit_price': str(item.unit_price),
+				}
+				for item in items[:cls.SUMMARY_LINES]
+			],
+			'units': sum(item.quantity for item in items),
+		}
+		return len(items), summary
+
+	@property
+	def more_items(self):
+		return max(self.item_count - len(self.summary.get('lines', [])), 0)
+
+	@property
+	def summary_text(self):
+		lines = ', '.join(f"{line['name']} x {line['quantity']}" for line in self.summary.get('lines', []))
+		if self.more_items:
+			lines += f" and {self.more_items} more"
+		return f"{self.item_count} item{'s' if self.item_count != 1 else ''}: {lines}" if lines else "No items"
+
+
+class Order(FieldTrackerMixin, OrderSummaryMixin, models.Model):
 	"""Delivers US005, US006, US012 and ADM010 order tracking across the purchase lifecycle."""
 	STATUS_CHOICES = [
 		('pending', 'Pending'),
@@ -64,20 +228,47 @@ class Order(models.Model):
 		('delivered', 'Delivered'),
 		('cancelled', 'Cancelled'),
 	]
+	# Order lifecycle: each status maps to the statuses it may move to next
+	ALLOWED_TRANSITIONS = {
+		'pending': ('processing', 'cancelled'),
+		'processing': ('shipped', 'cancelled'),
+		'shipped': ('delivered',),
+		'delivered': (),
+		'cancelled': (),
+	}
 
 	customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='orders')
 	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 	total_price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
 	shipping_address = models.CharField(max_length=255, blank=True)
+	# Denormalised from OrderItem so list views read one row per order; kept
+	# current by storefront.signals and written directly by bulk paths
+	item_count = models.PositiveIntegerField(default=0)
+	summary = models.JSONField(default=dict, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	is_archived = False
+	tracked_fields = ('status',)
+
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			# Archival sweeps and status dashboards filter on both
+			models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+		]
 
 	def __str__(self):
 		return f"Order #{self.pk} ({self.status})"
 
+	@classmethod
+	def allowed_sources(cls, target):
+		"""Statuses from which an order may move to ``target``."""
+		return [status for status, targets in cls.ALLOWED_TRANSITIONS.items() if target in targets]
+
+	def can_transition_to(self, target):
+		return target in self.ALLOWED_TRANSITIONS.get(self.status, ())
+
 
 class OrderItem(models.Model):
 	"""Captures line items for US005, US006, US012 and supports ADM010 fulfilment updates."""
@@ -90,6 +281,49 @@ class OrderItem(models.Model):
 		return f"{self.product.name} x {self.quantity}"
 
 
+class ArchivedOrder(OrderSummaryMixin, models.Model):
+	"""Cold copy of a delivered or cancelled Order, moved out of the hot tables by archive_orders."""
+	# Original Order id, so order numbers already shown to customers stay valid
+	id = models.BigIntegerField(primary_key=True)
+	customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_orders')
+	status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+	total_price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+	shipping_address = models.CharField(max_length=255, blank=True)
+	item_count = models.PositiveIntegerField(default=0)
+	summary = models.JSONField(default=dict, blank=True)
+	created_at = models.DateTimeField()
+	updated_at = models.DateTimeField()
+	archived_at = models.DateTimeField(auto_now_add=True)
+
+	is_archived = True
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['customer', '-created_at'], name='archivedorder_customer_idx'),
+		]
+
+	def __str__(self):
+		return f"Archived order #{self.pk} ({self.status})"
+
+
+class ArchivedOrderItem(models.Model):
+	"""Line items of an ArchivedOrder, keeping their original OrderItem ids."""
+	id = models.BigIntegerField(primary_key=True)
+	order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+	# Covered by the (product, order) index below
+	product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+', db_index=False)
+	quantity = models.PositiveIntegerField(default=1)
+	unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['product', 'order'], name='archivedorderitem_product_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.product.name} x {self.quantity}"
+
 class Cart(models.Model):
 	"""Enables US005 and US006 by holding an in-progress basket prior to checkout."""
 	customer = models.OneToOneField(Customer, on_delete=models.CASCADE, related_name='cart')
@@ -125,10 +359,32 @@ class Review(models.Model):
 
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			# Keyset pagination of a product's published reviews, newest first
+			models.Index(
+				fields=['product', '-created_at', '-id'],
+				name='review_product_recent_idx',
+				condition=models.Q(is_approved=True),
+			),
+		]
 
 	def __str__(self):
 		return f"Review {self.rating}/5 for {self.product.name}"
 
+	def serialize(self):
+		user = self.customer.user
+		return {
+			'id': self.id,
+			'rating': self.rating,
+			'title': self.title,
+			'comment': self.comment,
+			# Formatted as on the product page so loaded reviews match rendered ones
+			'author_initial': user.first_name[:1] or 'U',
+			'author_name': f"{user.first_name or 'Anonymous'} {user.last_name[:1]}.",
+			'created_at': self.created_at.isoformat(),
+			'created_display': dateformat.format(timezone.localtime(self.created_at), 'F d, Y'),
+		}
+
 
 class Promotion(models.Model):
 	"""Targets US014 personalised offers while ADM012 schedules category-based campaigns."""
@@ -172,6 +428,10 @@ class WatchlistItem(models.Model):
 	watchlist = models.ForeignKey(Watchlist, on_delete=models.CASCADE, related_name='items')
 	product = models.ForeignKey(Product, on_delete=models.CASCADE)
 	added_at = models.DateTimeField(auto_now_add=True)
+	# Effective price and availability when the shopper was last notified (or
+	# the item was added); notify_watchlist diffs current values against these
+	snapshot_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+	snapshot_in_stock = models.BooleanField(null=True, blank=True)
 
 	class Meta:
 		unique_together = ('watchlist', 'product')
@@ -180,6 +440,36 @@ class WatchlistItem(models.Model):
 		return f"{self.product.name} in watchlist"
 
 
+class WatchlistNotification(models.Model):
+	"""Outbox of US015 watchlist alerts, written in batches and delivered separately."""
+	KIND_CHOICES = [
+		('price_drop', 'Price Drop'),
+		('back_in_stock', 'Back in Stock'),
+	]
+
+	customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='watchlist_notifications')
+	product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+	kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+	previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+	price = models.DecimalField(max_digits=10, decimal_places=2)
+	created_at = models.DateTimeField(auto_now_add=True)
+	sent_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			# The sender scans undelivered rows in customer order
+			models.Index(
+				fields=['customer', 'id'],
+				name='watchnotif_pending_idx',
+				condition=models.Q(sent_at__isnull=True),
+			),
+		]
+
+	def __str__(self):
+		return f"{self.get_kind_display()} for {self.product.name}"
+
+
 class ChatSession(models.Model):
 	"""Supports US016 shopper enquiries and ADM013 staff oversight of active conversations."""
 	STATUS_CHOICES = [
@@ -193,9 +483,28 @@ class ChatSession(models.Model):
 	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
+	# Denormalised from ChatMessage by storefront.signals so chat lists read one
+	# row per session. Write other fields with update_fields so a stale instance
+	# cannot overwrite them
+	last_customer_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+	last_admin_message_at = models.DateTimeField(null=True, blank=True, editable=False)
+	# Admin messages since the customer's last message
+	unread_for_customer = models.PositiveIntegerField(default=0, editable=False)
+	# Time of the oldest customer message staff have not replied to yet
+	awaiting_reply_since = models.DateTimeField(null=True, blank=True, editable=False)
 
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			# Support queue sorted by oldest unanswered within a status
+			models.Index(fields=['status', 'awaiting_reply_since', 'id'], name='chatsession_queue_idx'),
+			# ... and across all statuses; only sessions awaiting a reply are indexed
+			models.Index(
+				fields=['awaiting_reply_since', 'id'],
+				name='chatsession_awaiting_idx',
+				condition=models.Q(awaiting_reply_since__isnull=False),
+			),
+		]
 
 	def __str__(self):
 		return f"Chat with {self.customer.user.username} ({self.status})"
@@ -215,10 +524,26 @@ class ChatMessage(models.Model):
 
 	class Meta:
 		ordering = ['created_at']
+		indexes = [
+			# Incremental fetches read a session's messages after a known id
+			models.Index(fields=['session', 'id'], name='chatmsg_session_id_idx'),
+			# Transcripts are paged from the latest message backwards
+			models.Index(fields=['session', 'created_at', 'id'], name='chatmsg_session_created_idx'),
+		]
 
 	def __str__(self):
 		return f"{self.sender} message"
 
+	def serialize(self):
+		return {
+			'id': self.id,
+			'sender': self.sender,
+			'message': self.message,
+			'created_at': self.created_at.isoformat(),
+			# Formatted as in the chat templates so pushed messages match rendered ones
+			'created_display': dateformat.format(timezone.localtime(self.created_at), 'M d, g:i A'),
+		}
+
 # AI Chatbot
 class AiChatSession(models.Model):
     # Links to the user
@@ -230,6 +555,13 @@ class AiChatSession(models.Model):
     
     # Status for clearing/archiving
     is_active = models.BooleanField(default=True) 
+
+    # Rolling summary of the turns that no longer fit in Aurora's prompt
+    # (see mlservices.conversation_memory), the last message folded into it,
+    # and the billable tokens spent writing it
+    history_summary = models.TextField(blank=True, default='', editable=False)
+    summary_through_id = models.BigIntegerField(default=0, editable=False)
+    summary_token_usage = models.IntegerField(default=0, editable=False)
     
     class Meta:
         # Show newest sessions first
@@ -263,7 +595,7 @@ class AiChatMessage(models.Model):
     def serialize(self):
         return {
             'id': self.id,
-            'session_id': self.session.id,
+            'session_id': self.session_id,
             'sender': self.sender,
             'content': self.content,
             'token_usage': self.token_usage,
@@ -273,3 +605,7 @@ class AiChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Transcripts are paged from the latest message backwards
+            models.Index(fields=['session', 'timestamp', 'id'], name='aichatmsg_session_ts_idx'),
+        ]
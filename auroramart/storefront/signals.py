@@ -1,12 +1,88 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
-from .models import Product 
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from .models import Product, Order, OrderItem, Review, ChatSession, ChatMessage
 from .utils.caching import CACHE_KEY_PRODUCT_CATALOG
+from .utils.eligibility import invalidate_eligibility
+from .utils.orders import refresh_order_summaries
+from .utils.pricing import record_price_changes
+
+# Fields the cached catalog is built from
+CATALOG_FIELDS = ('name', 'sku', 'category_id')
+
 
 @receiver([post_save, post_delete], sender=Product)
 def clear_product_catalog_cache(sender, instance, **kwargs):
-    """Deletes the catalog cache whenever a Product is created, updated, or deleted."""
+    """Deletes the catalog cache whenever a Product is created, deleted, or has catalog fields updated."""
+    if kwargs['signal'] is post_save and not kwargs.get('created'):
+        if not any(instance.has_changed(name) for name in CATALOG_FIELDS):
+            return
     cache.delete(CACHE_KEY_PRODUCT_CATALOG) 
     print(f"Cache INVALIDATED for {CACHE_KEY_PRODUCT_CATALOG} due to {sender.__name__} change.")
-    
\ No newline at end of file
+    
+
+
+@receiver(post_save, sender=Product)
+def record_product_price(sender, instance, created, **kwargs):
+    """Appends to the price history when a product is created or its price is edited."""
+    if created or instance.has_changed('price'):
+        record_price_changes(Product.objects.filter(pk=instance.pk))
+
+
+# post_save only: a delete receiver would disable fast cascade deletes of whole
+# orders. Item deletions through the Django admin refresh in OrderAdmin instead.
+@receiver(post_save, sender=OrderItem)
+def refresh_order_summary(sender, instance, **kwargs):
+    """Keeps the denormalised item count and summary on Order in step with its items."""
+    refresh_order_summaries([instance.order_id])
+
+
+@receiver(post_save, sender=Order)
+def invalidate_eligibility_on_delivery(sender, instance, created, **kwargs):
+    """Drops the customer's cached review eligibility when an order enters or leaves delivered."""
+    if created:
+        delivered_changed = instance.status == 'delivered'
+    else:
+        delivered_changed = instance.has_changed('status') and 'delivered' in (
+            instance.status, instance.previous('status')
+        )
+    if delivered_changed:
+        # Once committed, so a concurrent request cannot cache the old state again
+        customer_id = instance.customer_id
+        transaction.on_commit(lambda: invalidate_eligibility([customer_id]))
+
+
+# post_save only, like refresh_order_summary, so review deletes stay fast;
+# bulk rejection invalidates itself
+@receiver(post_save, sender=Review)
+def invalidate_eligibility_on_review(sender, instance, created, **kwargs):
+    """A new review uses up the customer's eligibility for that product."""
+    if created:
+        customer_id = instance.customer_id
+        transaction.on_commit(lambda: invalidate_eligibility([customer_id]))
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_chat_session_activity(sender, instance, created, **kwargs):
+    """Keeps the denormalised message timestamps and unread count on ChatSession current."""
+    if not created:
+        return
+    if instance.sender == 'admin':
+        changes = {
+            'last_admin_message_at': instance.created_at,
+            'unread_for_customer': F('unread_for_customer') + 1,
+            'awaiting_reply_since': None,
+        }
+    else:
+        # A customer reply means everything before it has been seen
+        changes = {
+            'last_customer_message_at': instance.created_at,
+            'unread_for_customer': 0,
+            # Keep the oldest unanswered message if staff have not replied yet
+            'awaiting_reply_since': Coalesce(F('awaiting_reply_since'), Value(instance.created_at)),
+        }
+    # Single UPDATE so concurrent messages cannot lose an increment
+    ChatSession.objects.filter(pk=instance.session_id).update(updated_at=instance.created_at, **changes)
@@ -1,3 +1,113 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
 
-# Create your tests here.
+from django.test import TransactionTestCase, override_settings
+
+from mlservices import gemini_client
+from mlservices.gemini_stub import STUB_MODEL_VERSION, make_stub_server
+from storefront.models import AiChatMessage, AiChatSession
+from storefront.utils.aurora import (
+    REPLY_INCOMPLETE_ERROR, REPLY_TIMEOUT_ERROR, REPLY_UNAVAILABLE_ERROR, reply_event_stream,
+)
+from users.models import Customer, User
+
+
+def _parse_events(body):
+    """``[(event, data), ...]`` from a server-sent event body."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class ReplyEventStreamTests(TransactionTestCase):
+    """reply_event_stream against the local Gemini stub (manage.py run_gemini_stub)."""
+
+    question = 'Is the Alpha in stock?'
+    contents = [{'role': 'user', 'parts': [{'text': question}]}]
+
+    def setUp(self):
+        user = User.objects.create_user('shopper', password='pw12345!x')
+        customer = Customer.objects.create(
+            user=user, age=30, household_size=1, has_children=False, monthly_income_sgd=1000,
+            gender='Male', employment_status='Student', occupation='Tech', education='Bachelor',
+        )
+        self.session = AiChatSession.objects.create(customer=customer)
+
+    def tearDown(self):
+        self._reset_clients()
+
+    def _reset_clients(self):
+        # Clients are pooled per process; each test points them at its own stub
+        gemini_client._sync_client = None
+        gemini_client._async_clients.clear()
+
+    def _stub(self, **options):
+        server = make_stub_server(port=0, chunk_delay=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_address[1]}/'
+
+    def _stream(self, base_url, native_async=False, timeout=5):
+        self._reset_clients()
+        with override_settings(GEMINI_API_KEY='test', GEMINI_BASE_URL=base_url, GEMINI_TIMEOUT_SECONDS=timeout):
+            response = reply_event_stream(self.session, self.question, self.contents, native_async)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            if native_async:
+                async def read():
+                    return [part async for part in response.streaming_content]
+                parts = asyncio.run(read())
+            else:
+                parts = list(response.streaming_content)
+        return _parse_events(b''.join(parts).decode())
+
+    def assertStoredNothing(self):
+        self.assertFalse(AiChatMessage.objects.exists())
+
+    def assertDone(self, events):
+        *chunks, (name, data) = events
+        self.assertEqual(name, 'done')
+        self.assertTrue(chunks)
+        self.assertEqual({event for event, _ in chunks}, {'chunk'})
+        reply = ''.join(chunk['text'] for _, chunk in chunks)
+        self.assertIn(self.question, reply)
+
+        user_message, bot_message = AiChatMessage.objects.order_by('id')
+        self.assertEqual((user_message.sender, user_message.content), ('user', self.question))
+        self.assertEqual((bot_message.sender, bot_message.content), ('bot', reply))
+        self.assertEqual(bot_message.model_used, STUB_MODEL_VERSION)
+        self.assertGreater(bot_message.token_usage, 0)
+        self.assertEqual(data['user_message']['id'], user_message.id)
+        self.assertEqual(data['bot_message']['id'], bot_message.id)
+
+    def test_complete_reply_is_streamed_then_stored(self):
+        self.assertDone(self._stream(self._stub(delay=0)))
+
+    def test_complete_reply_is_streamed_then_stored_async(self):
+        self.assertDone(self._stream(self._stub(delay=0), native_async=True))
+
+    def test_reply_cut_off_is_incomplete_and_not_stored(self):
+        for native_async in (False, True):
+            with self.subTest(native_async=native_async):
+                events = self._stream(self._stub(delay=0, fail_after=2), native_async=native_async)
+                self.assertEqual([name for name, _ in events], ['chunk', 'chunk', 'error'])
+                self.assertEqual(events[-1][1]['error'], REPLY_INCOMPLETE_ERROR)
+                self.assertStoredNothing()
+
+    def test_backend_down_is_an_error_and_not_stored(self):
+        # Nothing listens on the discard port
+        for native_async in (False, True):
+            with self.subTest(native_async=native_async):
+                events = self._stream('http://127.0.0.1:9/', native_async=native_async)
+                self.assertEqual(events, [('error', {'error': REPLY_UNAVAILABLE_ERROR})])
+                self.assertStoredNothing()
+
+    def test_slow_backend_times_out_and_is_not_stored(self):
+        for native_async in (False, True):
+            with self.subTest(native_async=native_async):
+                events = self._stream(self._stub(delay=2), native_async=native_async, timeout=0.5)
+                self.assertEqual(events, [('error', {'error': REPLY_TIMEOUT_ERROR})])
+                self.assertStoredNothing()
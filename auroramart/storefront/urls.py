@@ -26,6 +26,7 @@ urlpatterns = [
     
     # Reviews
     path('products/<str:sku>/review/', views.review_create_view, name='review_create'),
+    path('products/<str:sku>/reviews/', views.product_reviews, name='product_reviews'),
     path('reviews/', views.review_list_view, name='review_list'),
     
     # Watchlist
@@ -37,6 +38,8 @@ urlpatterns = [
     path('chat/', views.chat_list, name='chat_list'),
     path('chat/create/', views.chat_create, name='chat_create'),
     path('chat/<int:session_id>/', views.chat_detail, name='chat_detail'),
+    path('chat/<int:session_id>/messages/', views.chat_messages, name='chat_messages'),
+    path('chat/<int:session_id>/stream/', views.chat_stream, name='chat_stream'),
     path('chat/<int:session_id>/close/', views.chat_close, name='chat_close'),
     
     # Flash Sale Products
@@ -45,5 +48,7 @@ urlpatterns = [
     # Chatbot Integration
     path('aurora/', views.aurora_chatbot_view, name='aurora_chatbot'),
     path('aurora/ask/', views.ask_aurora, name='ask_aurora'),
+    path('aurora/ask/stream/', views.ask_aurora_stream, name='ask_aurora_stream'),
     path('aurora/clear/<int:session_id>/', views.clear_chat, name='clear_chat'),
+    path('aurora/<int:session_id>/messages/', views.aurora_messages, name='aurora_messages'),
 ]
\ No newline at end of file
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from google.genai import errors as genai_errors
+import httpx
+
+from mlservices.conversation_memory import schedule_fold
+from mlservices.gemini_client import get_async_client, get_client, token_usage
+from storefront.models import AiChatMessage
+
+# Shown to the shopper when a reply fails
+REPLY_TIMEOUT_ERROR = 'Aurora took too long to respond. Please try again.'
+REPLY_UNAVAILABLE_ERROR = 'Aurora is unavailable right now. Please try again.'
+REPLY_INCOMPLETE_ERROR = 'Aurora stopped before finishing. Please try again.'
+
+
+def save_exchange(session, user_query, reply, usage=0, model_used=None):
+    """
+    Store a question and Aurora's reply together, so a failed call leaves no
+    orphan question, then queue the session's history summary for updating.
+    """
+    with transaction.atomic():
+        user_message = AiChatMessage.objects.create(
+            session=session,
+            sender='user',
+            content=user_query
+        )
+        bot_message = AiChatMessage.objects.create(
+            session=session,
+            sender='bot',
+            content=reply,
+            token_usage=usage, # billable token usage
+            model_used=model_used
+        )
+        transaction.on_commit(lambda: schedule_fold(session.pk))
+    return user_message, bot_message
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class _ReplyBuffer:
+    """Accumulates streamed chunks into the reply that is stored at the end."""
+
+    def __init__(self):
+        self.parts = []
+        self.usage = 0
+        self.model_used = None
+        self.finished = False
+
+    def add(self, chunk):
+        """Record ``chunk`` and return its text (possibly empty)."""
+        text = chunk.text or ''
+        self.parts.append(text)
+        if chunk.usage_metadata is not None:
+            self.usage = token_usage(chunk)
+        self.model_used = chunk.model_version or self.model_used
+        if chunk.candidates and chunk.candidates[0].finish_reason:
+            self.finished = True
+        return text
+
+
+def _stream_events_sync(session, user_query, contents):
+    buffer = _ReplyBuffer()
+    try:
+        stream = get_client().models.generate_content_stream(model=settings.GEMINI_MODEL, contents=contents)
+        for chunk in stream:
+            text = buffer.add(chunk)
+            if text:
+                yield sse_event('chunk', {'text': text})
+    except httpx.TimeoutException:
+        yield sse_event('error', {'error': REPLY_TIMEOUT_ERROR})
+        return
+    except (genai_errors.APIError, httpx.HTTPError):
+        yield sse_event('error', {'error': REPLY_UNAVAILABLE_ERROR})
+        return
+    if not buffer.finished:
+        yield sse_event('error', {'error': REPLY_INCOMPLETE_ERROR})
+        return
+    user_message, bot_message = save_exchange(
+        session, user_query, ''.join(buffer.parts), buffer.usage, buffer.model_used
+    )
+    yield sse_event('done', {'user_message': user_message.serialize(), 'bot_message': bot_message.serialize()})
+
+
+async def _stream_events_async(session, user_query, contents):
+    buffer = _ReplyBuffer()
+    try:
+        stream = await asyncio.wait_for(
+            get_async_client().models.generate_content_stream(model=settings.GEMINI_MODEL, contents=contents),
+            timeout=settings.GEMINI_TIMEOUT_SECONDS,
+        )
+        while True:
+            # Each chunk must arrive within the timeout; a long reply may take longer overall
+            try:
+                chunk = await asyncio.wait_for(anext(stream), timeout=settings.GEMINI_TIMEOUT_SECONDS)
+            except StopAsyncIteration:
+                break
+            text = buffer.add(chunk)
+            if text:
+                yield sse_event('chunk', {'text': text})
+    except (asyncio.TimeoutError, httpx.TimeoutException):
+        yield sse_event('error', {'error': REPLY_TIMEOUT_ERROR})
+        return
+    except (genai_errors.APIError, httpx.HTTPError):
+        yield sse_event('error', {'error': REPLY_UNAVAILABLE_ERROR})
+        return
+    if not buffer.finished:
+        yield sse_event('error', {'error': REPLY_INCOMPLETE_ERROR})
+        return
+    user_message, bot_message = await sync_to_async(save_exchange)(
+        session, user_query, ''.join(buffer.parts), buffer.usage, buffer.model_used
+    )
+    yield sse_event('done', {'user_message': user_message.serialize(), 'bot_message': bot_message.serialize()})
+
+
+def reply_event_stream(session, user_query, contents, native_async):
+    """
+    Server-sent event response streaming Aurora's reply to ``user_query``.
+
+    Each model chunk is forwarded as a ``chunk`` event as soon as it arrives.
+    The question and the full reply are stored, with the token usage from
+    the final chunk, only once the model reports that it has finished; the
+    stream then ends with a ``done`` event carrying both stored messages.
+    If the model fails, times out or stops without finishing, the stream
+    ends with an ``error`` event instead and nothing is stored, so the
+    shopper discards the partial reply and can ask again. Under WSGI a
+    client disconnect closes the stream, so nothing is stored; under ASGI
+    the reply is still stored if the model finishes.
+
+    ``native_async`` selects the pooled async client, for requests served
+    over ASGI; otherwise the pooled sync client streams from a generator.
+    """
+    if native_async:
+        events = _stream_events_async(session, user_query, contents)
+    else:
+        events = _stream_events_sync(session, user_query, contents)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,3 +1,9 @@
 # Define the global constants
 CACHE_KEY_PRODUCT_CATALOG = 'product_name_catalog' 
 CACHE_TIMEOUT = 60 * 60 * 24 # 1 day
+CACHE_KEY_ARCHIVE_TOTALS = 'archived_order_totals'
+# Formatted with a customer id; see storefront.utils.eligibility
+CACHE_KEY_CUSTOMER_ELIGIBILITY = 'customer_eligibility:{}'
+# Formatted with a customer id; short-lived since only add/remove keep it current
+CACHE_KEY_WATCHLIST_IDS = 'watchlist_product_ids:{}'
+WATCHLIST_IDS_TIMEOUT = 60 * 5
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import (
+    BooleanField, Count, ExpressionWrapper, OuterRef, Q, Subquery,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from storefront.models import ChatMessage, ChatSession
+
+# Most messages returned by one incremental fetch or stream poll
+CHAT_FETCH_LIMIT = 100
+# Messages rendered when a transcript opens and per "load earlier" request
+TRANSCRIPT_PAGE_SIZE = 50
+# Seconds between checks for new messages while a stream is open
+CHAT_POLL_INTERVAL = 2
+# Streams end after this many seconds and the browser reconnects from the
+# last event id. Each open stream parks a thread, so they are kept short
+CHAT_STREAM_LIFETIME = 60
+# Milliseconds the browser waits before reconnecting a finished stream
+CHAT_STREAM_RETRY = 1000
+
+
+def parse_since_id(value):
+    """Parse a ``since_id`` / ``Last-Event-ID`` value, treating blank as 0. Raises ValueError."""
+    if value in (None, ''):
+        return 0
+    since_id = int(value)
+    if since_id < 0:
+        raise ValueError('since_id must not be negative')
+    return since_id
+
+
+def messages_since(session_id, since_id=0, limit=CHAT_FETCH_LIMIT):
+    """
+    Messages in a chat session with an id above ``since_id``, oldest first.
+
+    Served by the (session, id) index, so the cost depends on the number of
+    new messages rather than on the length of the conversation.
+    """
+    return ChatMessage.objects.filter(session_id=session_id, id__gt=since_id).order_by('id')[:limit]
+
+
+def encode_transcript_cursor(message, time_field='created_at'):
+    return f'{getattr(message, time_field).isoformat()}_{message.pk}'
+
+
+def decode_transcript_cursor(cursor):
+    """Parse a cursor from ``encode_transcript_cursor``; raises ValueError if malformed."""
+    sent_at, _, pk = cursor.rpartition('_')
+    return datetime.fromisoformat(sent_at), int(pk)
+
+
+def transcript_page(messages, time_field='created_at', before=None, size=TRANSCRIPT_PAGE_SIZE):
+    """
+    Return ``(page, earlier_cursor)`` for the latest ``size`` of ``messages``.
+
+    ``messages`` is one session's messages (``ChatMessage`` keyed on
+    ``created_at``, ``AiChatMessage`` on ``timestamp``). With ``before`` the
+    page ends just ahead of that cursor instead. Pages are keyed on
+    ``(session, time_field, id)`` and returned oldest first, so opening a long
+    conversation reads one page from the index however long it is.
+    ``earlier_cursor`` is None once the start of the conversation is reached.
+    Raises ValueError for a malformed ``before``.
+    """
+    messages = messages.order_by(f'-{time_field}', '-id')
+    if before:
+        sent_at, pk = decode_transcript_cursor(before)
+        messages = messages.filter(
+            Q(**{f'{time_field}__lt': sent_at}) | Q(**{time_field: sent_at, 'id__lt': pk})
+        )
+
+    # One extra row tells us whether anything earlier exists
+    page = list(messages[:size + 1])
+    earlier_cursor = None
+    if len(page) > size:
+        page = page[:size]
+        earlier_cursor = encode_transcript_cursor(page[-1], time_field)
+    page.reverse()
+    return page, earlier_cursor
+
+
+def _message_event(message):
+    data = json.dumps(message.serialize())
+    return f'id: {message.id}\nevent: message\ndata: {data}\n\n'
+
+
+def _sync_events(session_id, since_id):
+    # One poll per request: the browser reconnects after the poll interval,
+    # so no worker thread is held between checks
+    yield f'retry: {CHAT_POLL_INTERVAL * 1000}\n\n'
+    for message in messages_since(session_id, since_id):
+        yield _message_event(message)
+
+
+def _poll_messages(session_id, since_id):
+    # Connections are otherwise only closed when the request finishes, so
+    # release it after each poll rather than hold it for the stream's lifetime
+    try:
+        return list(messages_since(session_id, since_id))
+    finally:
+        connection.close()
+
+
+async def _async_events(session_id, since_id, lifetime):
+    yield f'retry: {CHAT_STREAM_RETRY}\n\n'
+    deadline = time.monotonic() + lifetime
+    while True:
+        batch = await sync_to_async(_poll_messages)(session_id, since_id)
+        for message in batch:
+            since_id = message.id
+            yield _message_event(message)
+        if not batch:
+            yield ': keepalive\n\n'
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(CHAT_POLL_INTERVAL)
+
+
+def chat_event_stream(request, session_id, since_id=0):
+    """
+    Server-sent event response pushing a chat session's new messages.
+
+    Each event carries a serialized message and its id, so a reconnecting
+    ``EventSource`` resumes from ``Last-Event-ID`` without gaps. Served over
+    ASGI the stream stays open for ``CHAT_STREAM_LIFETIME`` seconds, polling
+    every ``CHAT_POLL_INTERVAL``. Django runs each ASGI request's sync code on
+    a thread of its own, so every open stream parks one idle thread, but no
+    database connection is held between polls. Over WSGI, where an open
+    stream would tie up a worker, each request sends only the messages
+    already waiting and closes, and the browser's reconnects poll every
+    ``CHAT_POLL_INTERVAL`` seconds.
+    """
+    if isinstance(request, ASGIRequest):
+        events = _async_events(session_id, since_id, CHAT_STREAM_LIFETIME)
+    else:
+        events = _sync_events(session_id, since_id)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def reply_overdue_cutoff(now=None):
+    """Sessions awaiting a reply since before this are past the reply SLA."""
+    return (now or timezone.now()) - timedelta(minutes=settings.CHAT_REPLY_SLA_MINUTES)
+
+
+def with_queue_stats(queryset=None, now=None):
+    """
+    Annotate chat sessions with what the support queue shows for each row.
+
+    Adds ``message_count``, ``first_message``, ``last_message_at`` (from the
+    stored activity timestamps) and ``is_overdue``, which is set for open
+    sessions whose oldest unanswered message is past the reply SLA. The message
+    subqueries run per returned row on the (session, id) index, so a page
+    costs one query however many sessions exist.
+    """
+    if queryset is None:
+        queryset = ChatSession.objects.all()
+    session_messages = ChatMessage.objects.filter(session=OuterRef('pk')).order_by()
+    return queryset.annotate(
+        message_count=Coalesce(Subquery(
+            session_messages.values('session').annotate(total=Count('id')).values('total')
+        ), 0),
+        first_message=Subquery(session_messages.order_by('created_at', 'id').values('message')[:1]),
+        last_message_at=Greatest(
+            Coalesce('last_customer_message_at', 'last_admin_message_at'),
+            Coalesce('last_admin_message_at', 'last_customer_message_at'),
+        ),
+        is_overdue=ExpressionWrapper(
+            Q(status='open', awaiting_reply_since__lte=reply_overdue_cutoff(now)),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def support_queue_counts(now=None):
+    """Totals for the support queue badges, from one conditional aggregate."""
+    return ChatSession.objects.aggregate(
+        total_count=Count('id'),
+        open_count=Count('id', filter=Q(status='open')),
+        closed_count=Count('id', filter=Q(status='closed')),
+        awaiting_count=Count('id', filter=Q(status='open', awaiting_reply_since__isnull=False)),
+        overdue_count=Count(
+            'id', filter=Q(status='open', awaiting_reply_since__lte=reply_overdue_cutoff(now)),
+        ),
+    )
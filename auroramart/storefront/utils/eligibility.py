@@ -0,0 +1,56 @@
+"""
+Per-customer purchase and review eligibility.
+
+A customer may review a product once they have a delivered order containing
+it and have not reviewed it yet. Both sets of product ids are loaded together
+(two queries), cached per customer and memoised on the customer instance, so
+every eligibility check on a page is a set lookup. The cache entry is dropped
+by ``invalidate_eligibility`` whenever an order is delivered or a review is
+written or removed.
+"""
+from django.core.cache import cache
+
+from storefront.models import ArchivedOrderItem, OrderItem, Review
+from storefront.utils.caching import CACHE_KEY_CUSTOMER_ELIGIBILITY, CACHE_TIMEOUT
+
+
+def _load_eligibility(customer):
+    # Delivered orders may already have been moved to the archive
+    delivered = (
+        OrderItem.objects.filter(order__customer=customer, order__status='delivered')
+        .values_list('product_id', flat=True)
+        .union(
+            ArchivedOrderItem.objects.filter(order__customer=customer, order__status='delivered')
+            .values_list('product_id', flat=True)
+        )
+    )
+    reviewed = Review.objects.filter(customer=customer).values_list('product_id', flat=True)
+    return {'purchased': frozenset(delivered), 'reviewed': frozenset(reviewed)}
+
+
+def get_eligibility(customer):
+    """Return ``{'purchased': ids, 'reviewed': ids}`` for ``customer``."""
+    eligibility = getattr(customer, '_eligibility', None)
+    if eligibility is None:
+        key = CACHE_KEY_CUSTOMER_ELIGIBILITY.format(customer.pk)
+        eligibility = cache.get(key)
+        if eligibility is None:
+            eligibility = _load_eligibility(customer)
+            cache.set(key, eligibility, CACHE_TIMEOUT)
+        customer._eligibility = eligibility
+    return eligibility
+
+
+def invalidate_eligibility(customer_ids):
+    """Drop the cached eligibility of the given customers."""
+    cache.delete_many([CACHE_KEY_CUSTOMER_ELIGIBILITY.format(pk) for pk in set(customer_ids)])
+
+
+def has_purchased(customer, product):
+    """Whether the customer has a delivered order containing ``product``, live or archived."""
+    return product.pk in get_eligibility(customer)['purchased']
+
+
+def has_reviewed(customer, product):
+    """Whether the customer has written a review of ``product``, approved or not."""
+    return product.pk in get_eligibility(customer)['reviewed']
@@ -0,0 +1,287 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Case, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from admin_panel.models import AuditLog
+from storefront.models import OrderItem, Product, StockMovement, StockSnapshot
+from storefront.utils.caching import CACHE_KEY_PRODUCT_CATALOG
+from storefront.utils.pricing import record_price_changes
+
+
+LOW_STOCK = Q(stock__lte=F('reorder_threshold'))
+
+
+class InsufficientStock(ValueError):
+    """Raised when a stock decrement would take a product below zero."""
+
+
+def low_stock_after(delta):
+    """
+    Expression for ``is_low_stock`` once ``delta`` has been added to stock.
+
+    The right-hand side of an UPDATE sees pre-update column values, so the
+    delta is moved onto the threshold side of the comparison.
+    """
+    return Case(
+        When(stock__lte=F('reorder_threshold') - delta, then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+
+def stock_delta_case(deltas):
+    """Build a CASE expression mapping product ids to their stock delta."""
+    return Case(
+        *[When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def record_stock_movements(deltas, reason, reference='', actor=None):
+    """Append one ledger row per non-zero entry of ``deltas`` with a single insert."""
+    return StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=product_id,
+            delta=delta,
+            reason=reason,
+            reference=str(reference),
+            actor=actor,
+        )
+        for product_id, delta in deltas.items() if delta
+    ])
+
+
+def update_stock_levels(deltas):
+    """
+    Apply per-product stock deltas with a single UPDATE statement.
+
+    ``deltas`` maps product ids to the signed quantity to add. The update is
+    all-or-nothing: if any product would drop below zero nothing is written
+    and ``InsufficientStock`` is raised. Nothing is written to the ledger, so
+    callers must record movements themselves.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    delta = stock_delta_case(deltas)
+    with transaction.atomic():
+        updated = Product.objects.filter(pk__in=deltas, stock__gte=-delta).update(
+            stock=F('stock') + delta,
+            is_low_stock=low_stock_after(delta),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        if updated != len(deltas):
+            short = Product.objects.filter(pk__in=deltas, stock__lt=-delta).first()
+            raise InsufficientStock(
+                f'Insufficient stock for {short.name}' if short else 'Insufficient stock'
+            )
+    return updated
+
+
+def apply_stock_deltas(deltas, reason, reference='', actor=None):
+    """
+    Apply per-product stock deltas and record them in the stock ledger.
+
+    See ``update_stock_levels``. Product signals are bypassed, so callers are
+    responsible for audit logging.
+    """
+    with transaction.atomic():
+        updated = update_stock_levels(deltas)
+        record_stock_movements(deltas, reason, reference, actor)
+    return updated
+
+
+def order_item_quantities(order_ids):
+    """Return {product_id: total quantity} across the items of the given orders."""
+    return dict(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+
+
+def bulk_adjust_stock(product_ids, adjustment, actor=None):
+    """
+    Add ``adjustment`` to the stock of every product in ``product_ids``.
+
+    Products whose stock would drop below zero are rejected by the WHERE
+    clause and left untouched. The remaining rows are updated with one UPDATE
+    and audited with one bulk insert. Returns ``(updated, rejected)`` as lists
+    of product names.
+    """
+    with transaction.atomic():
+        products = Product.objects.select_for_update().filter(pk__in=product_ids)
+        minimum_stock = max(-adjustment, 0)
+
+        rejected = []
+        if minimum_stock:
+            rejected = list(
+                products.filter(stock__lt=minimum_stock).values_list('name', flat=True)
+            )
+        eligible = list(
+            products.filter(stock__gte=minimum_stock).values_list('pk', 'sku', 'name')
+        )
+        if not eligible:
+            return [], rejected
+
+        Product.objects.filter(
+            pk__in=[pk for pk, _, _ in eligible],
+            stock__gte=minimum_stock,
+        ).update(
+            stock=F('stock') + adjustment,
+            is_low_stock=low_stock_after(Value(adjustment)),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+
+        record_stock_movements(
+            {pk: adjustment for pk, _, _ in eligible}, 'bulk_adjust', actor=actor
+        )
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                actor=actor,
+                action='update',
+                entity_type='Product',
+                entity_id=sku,
+                summary=f'Adjusted stock by {adjustment:+d} for product: {name}'
+            )
+            for _, sku, name in eligible
+        ])
+
+    # Signals are bypassed above, so invalidate the catalog once for the batch
+    cache.delete(CACHE_KEY_PRODUCT_CATALOG)
+    return [name for _, _, name in eligible], rejected
+
+
+def update_product_if_current(product, changes, expected_version, actor=None):
+    """
+    Write ``changes`` to ``product`` only if it is still at ``expected_version``.
+
+    Only the changed columns are written, in one conditional UPDATE that also
+    bumps the version, so an edit based on a stale form can never overwrite a
+    concurrent checkout or stock adjustment. ``product`` must hold the values
+    the form was diffed against. Returns False if the row changed in the
+    meantime, in which case nothing is written.
+    """
+    if not changes:
+        return True
+
+    fields = dict(changes)
+    if 'stock' in fields and 'reorder_threshold' in fields:
+        fields['is_low_stock'] = fields['stock'] <= fields['reorder_threshold']
+    elif 'stock' in fields:
+        fields['is_low_stock'] = Case(
+            When(reorder_threshold__gte=fields['stock'], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    elif 'reorder_threshold' in fields:
+        fields['is_low_stock'] = Case(
+            When(stock__lte=fields['reorder_threshold'], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product.pk, version=expected_version).update(
+            **fields,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            return False
+
+        if 'stock' in changes:
+            record_stock_movements(
+                {product.pk: changes['stock'] - product.stock}, 'admin_edit', actor=actor
+            )
+        if 'price' in changes:
+            record_price_changes(Product.objects.filter(pk=product.pk))
+        AuditLog.objects.create(
+            actor=actor,
+            action='update',
+            entity_type='Product',
+            entity_id=str(changes.get('sku', product.sku)),
+            summary=f'Updated product: {changes.get("name", product.name)} ({", ".join(sorted(changes))})'
+        )
+
+    # Signals are bypassed above, so invalidate the catalog here
+    cache.delete(CACHE_KEY_PRODUCT_CATALOG)
+    product.refresh_from_db()
+    return True
+
+
+def reconcile_low_stock_flags():
+    """
+    Repair ``is_low_stock`` flags that disagree with stock and threshold.
+
+    Returns ``(flagged, cleared)``: the number of products newly marked low on
+    stock and the number no longer marked.
+    """
+    flagged = Product.objects.filter(LOW_STOCK, is_low_stock=False).update(is_low_stock=True)
+    cleared = Product.objects.filter(~LOW_STOCK, is_low_stock=True).update(is_low_stock=False)
+    return flagged, cleared
+
+
+def with_expected_stock(queryset=None):
+    """
+    Annotate products with the stock level implied by the ledger.
+
+    ``expected_stock`` is the product's latest snapshot plus the sum of all
+    movements recorded after that snapshot's watermark, computed in the same
+    query as the products themselves.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    latest_snapshot = StockSnapshot.objects.filter(product=OuterRef('pk')).order_by('-id')
+    movements_since = (
+        StockMovement.objects
+        .filter(product=OuterRef('pk'), id__gt=OuterRef('snapshot_watermark'))
+        .order_by()
+        .values('product')
+        .annotate(total=Sum('delta'))
+        .values('total')
+    )
+    return queryset.annotate(
+        snapshot_stock=Coalesce(Subquery(latest_snapshot.values('stock')[:1]), 0),
+        snapshot_watermark=Coalesce(Subquery(latest_snapshot.values('movement_watermark')[:1]), 0),
+    ).annotate(
+        expected_stock=F('snapshot_stock') + Coalesce(Subquery(movements_since), 0),
+    )
+
+
+def stock_drift(queryset=None):
+    """Products whose stored stock disagrees with the ledger, with ``drift`` annotated."""
+    return (
+        with_expected_stock(queryset)
+        .annotate(drift=F('stock') - F('expected_stock'))
+        .exclude(drift=0)
+    )
+
+
+def take_stock_snapshot():
+    """
+    Snapshot every product's current stock against the latest ledger entry.
+
+    Products are locked while the watermark is read, so no movement can land
+    between the stock values and the watermark they are recorded against.
+    Returns the number of snapshots written.
+    """
+    with transaction.atomic():
+        levels = list(Product.objects.select_for_update().values_list('pk', 'stock'))
+        watermark = StockMovement.objects.aggregate(latest=Max('id'))['latest'] or 0
+        StockSnapshot.objects.bulk_create(
+            [
+                StockSnapshot(product_id=pk, stock=stock, movement_watermark=watermark)
+                for pk, stock in levels
+            ],
+            batch_size=1000,
+        )
+    return len(levels)
@@ -0,0 +1,209 @@
+from itertools import groupby
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from admin_panel.models import AuditLog
+from storefront.models import (
+    ArchivedOrder, ArchivedOrderItem, ChatSession, Order, OrderItem, StockMovement,
+)
+from storefront.utils.caching import CACHE_KEY_ARCHIVE_TOTALS, CACHE_TIMEOUT
+from storefront.utils.eligibility import invalidate_eligibility
+from storefront.utils.inventory import order_item_quantities, update_stock_levels
+
+# Only orders in a final state are moved to the archive
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+ORDER_COPY_FIELDS = (
+    'id', 'customer_id', 'status', 'total_price', 'shipping_address',
+    'item_count', 'summary', 'created_at', 'updated_at',
+)
+ITEM_COPY_FIELDS = ('id', 'order_id', 'product_id', 'quantity', 'unit_price')
+
+# Upper bound on ids per UPDATE, to stay within database parameter limits
+TRANSITION_BATCH_SIZE = 1000
+
+
+def refresh_order_summaries(order_ids, batch_size=1000):
+    """
+    Recompute ``item_count`` and ``summary`` for the given orders.
+
+    Items are read with one query and the orders written back with
+    ``bulk_update``; orders that no longer have items get an empty summary.
+    """
+    order_ids = set(order_ids)
+    if not order_ids:
+        return 0
+
+    items = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .select_related('product')
+        .only('order_id', 'quantity', 'unit_price', 'product__name')
+        .order_by('order_id', 'id')
+    )
+    summaries = {
+        order_id: Order.build_summary(order_items)
+        for order_id, order_items in groupby(items, key=lambda item: item.order_id)
+    }
+
+    orders = []
+    for order_id in order_ids:
+        item_count, summary = summaries.get(order_id) or Order.build_summary([])
+        orders.append(Order(pk=order_id, item_count=item_count, summary=summary))
+    Order.objects.bulk_update(orders, ['item_count', 'summary'], batch_size=batch_size)
+    return len(orders)
+
+
+def transition_orders(orders, target, actor=None, batch_size=TRANSITION_BATCH_SIZE):
+    """
+    Move every order in ``orders`` that is allowed to reach ``target`` there.
+
+    ``orders`` is an Order queryset. Orders whose current status does not allow
+    the transition are skipped. Each batch is one ``UPDATE ... WHERE id IN (...)
+    AND status IN (allowed sources)`` plus one bulk insert of audit entries;
+    cancellations also restock all their items in a single stock UPDATE.
+    Returns the ids of the orders that were transitioned.
+    """
+    sources = Order.allowed_sources(target)
+    if not sources:
+        return []
+    status_label = dict(Order.STATUS_CHOICES)[target]
+    suffix = ' (stock restored)' if target == 'cancelled' else ''
+
+    transitioned = []
+    with transaction.atomic():
+        # Lock through a subquery so joins in the caller's filters are not locked too
+        locked = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=orders.values('pk'), status__in=sources)
+            .order_by('pk')
+            .values_list('pk', 'customer_id')
+        )
+        order_ids = [pk for pk, _ in locked]
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            Order.objects.filter(pk__in=batch, status__in=sources).update(
+                status=target, updated_at=timezone.now()
+            )
+            if target == 'cancelled':
+                _restock_orders(batch, actor)
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    actor=actor,
+                    action='update',
+                    entity_type='Order',
+                    entity_id=str(order_id),
+                    summary=f'Order #{order_id} status changed to {status_label}{suffix}'
+                )
+                for order_id in batch
+            ])
+            transitioned.extend(batch)
+        if target == 'delivered' and locked:
+            # Delivery makes the products reviewable; drop the cached eligibility
+            # once the new status is visible to other requests
+            customer_ids = {customer_id for _, customer_id in locked}
+            transaction.on_commit(lambda: invalidate_eligibility(customer_ids))
+    return transitioned
+
+
+def _restock_orders(order_ids, actor=None):
+    """Return the items of cancelled orders to stock, with one ledger row per order and product."""
+    update_stock_levels(order_item_quantities(order_ids))
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=row['product_id'],
+            delta=row['total'],
+            reason='cancellation',
+            reference=str(row['order_id']),
+            actor=actor,
+        )
+        for row in (
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('order_id', 'product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+        )
+    ])
+
+
+def cancel_order(order, actor=None):
+    """
+    Cancel an order and return its items to stock.
+
+    The status change is a conditional UPDATE, so an order that is already
+    cancelled (or gets cancelled concurrently) is never restocked twice.
+    Returns True if this call performed the cancellation.
+    """
+    if not transition_orders(Order.objects.filter(pk=order.pk), 'cancelled', actor=actor):
+        return False
+    order.status = 'cancelled'
+    return True
+
+
+def archivable_orders(cutoff):
+    """Final-state orders created before ``cutoff`` that no support chat points at."""
+    return (
+        Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+        .exclude(Exists(ChatSession.objects.filter(order=OuterRef('pk'))))
+    )
+
+
+def archive_order_batch(cutoff, batch_size=1000):
+    """
+    Move one batch of archivable orders and their items to the archive tables.
+
+    The copy and the delete happen in one transaction, so an order is always in
+    exactly one of the two tables. Returns the number of orders moved.
+    """
+    with transaction.atomic():
+        rows = list(
+            archivable_orders(cutoff).select_for_update()
+            .order_by('id')
+            .values(*ORDER_COPY_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        order_ids = [row['id'] for row in rows]
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in rows])
+        ArchivedOrderItem.objects.bulk_create(
+            [
+                ArchivedOrderItem(**row)
+                for row in OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_COPY_FIELDS)
+            ],
+            batch_size=batch_size,
+        )
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+
+    cache.delete(CACHE_KEY_ARCHIVE_TOTALS)
+    return len(order_ids)
+
+
+def archive_totals():
+    """
+    Aggregates over the archive for dashboard totals.
+
+    The archive only changes when orders are archived, so the result is cached
+    until the next archive batch rather than scanned on every dashboard view.
+    """
+    totals = cache.get(CACHE_KEY_ARCHIVE_TOTALS)
+    if totals is None:
+        totals = ArchivedOrder.objects.aggregate(
+            orders=Count('id'),
+            delivered=Count('id', filter=Q(status='delivered')),
+            revenue=Sum('total_price', filter=Q(status='delivered')),
+            multi_item=Count('id', filter=Q(item_count__gt=1)),
+        )
+        cache.set(CACHE_KEY_ARCHIVE_TOTALS, totals, CACHE_TIMEOUT)
+    return totals
+
+
+def get_customer_order(customer, order_id):
+    """Return the customer's order from the live table, falling back to the archive, or None."""
+    order = Order.objects.filter(pk=order_id, customer=customer).first()
+    if order is None:
+        order = ArchivedOrder.objects.filter(pk=order_id, customer=customer).first()
+    return order
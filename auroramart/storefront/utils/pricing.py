@@ -0,0 +1,155 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Least, Round
+from django.utils import timezone
+
+from storefront.models import PriceHistory, Product, Promotion
+
+CENT = Decimal('0.01')
+
+
+class _PriceField(DecimalField):
+    """
+    Output field for computed prices. Backends such as SQLite only quantize
+    plain column reads, so annotated prices are rounded to the cent here.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return value if value is None else Decimal(value).quantize(CENT)
+
+
+PRICE_FIELD = _PriceField(max_digits=10, decimal_places=2)
+
+
+def best_discount(product_ref='pk', category_ref='category_id', today=None):
+    """
+    Subquery for the highest active promotion discount on a product.
+
+    Mirrors ``Promotion.applies_to_product``: a promotion applies if it lists
+    the product or the product's category. ``product_ref`` and
+    ``category_ref`` are paths from the outer query to the product's id and
+    category id. Evaluates to NULL when no promotion applies.
+    """
+    today = today or date.today()
+    return Subquery(
+        Promotion.objects.filter(is_active=True, start_date__lte=today, end_date__gte=today)
+        .filter(Q(products=OuterRef(product_ref)) | Q(categories=OuterRef(category_ref)))
+        .order_by('-discount_percent')
+        .values('discount_percent')[:1],
+        output_field=DecimalField(max_digits=5, decimal_places=2),
+    )
+
+
+def effective_price(price='price', product_ref='pk', category_ref='category_id', today=None):
+    """SQL expression for a product's price after its best active promotion, to the cent."""
+    discount = Coalesce(best_discount(product_ref, category_ref, today), Value(Decimal('0')))
+    return Round(
+        F(price) - F(price) * discount / Value(Decimal('100')),
+        2,
+        output_field=PRICE_FIELD,
+    )
+
+
+def with_effective_price(queryset, today=None):
+    """Annotate a Product queryset with ``effective_price``."""
+    return queryset.annotate(effective_price=effective_price(today=today))
+
+
+def promoted_product_ids(promotions):
+    """
+    Ids of the products any promotion in ``promotions`` applies to, directly or
+    through their category, to scope ``record_price_changes`` after a
+    promotion is edited. Evaluated immediately, so it can be taken before a
+    delete.
+    """
+    return set(
+        Product.objects.filter(
+            Q(pk__in=Promotion.products.through.objects.filter(promotion__in=promotions).values('product_id'))
+            | Q(category__in=Promotion.categories.through.objects.filter(promotion__in=promotions).values('category_id'))
+        ).values_list('pk', flat=True)
+    )
+
+
+def _latest_history(when=None):
+    """PriceHistory rows of the outer product in effect at ``when`` (default: now), latest first."""
+    history = PriceHistory.objects.filter(product=OuterRef('pk'))
+    if when is not None:
+        history = history.filter(valid_from__lte=when)
+    return history.order_by('-valid_from', '-id')
+
+
+def record_price_changes(queryset=None, today=None):
+    """
+    Append a PriceHistory row for every product whose price has changed.
+
+    A row is written when a product's list or effective price differs from
+    its latest row (or it has none). The comparison is made in SQL in the
+    same query that computes the effective price, so unchanged products cost
+    nothing beyond that one query. Returns the number of rows written.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+    latest = _latest_history()
+    changed = (
+        with_effective_price(queryset, today)
+        .annotate(
+            last_price=Subquery(latest.values('price')[:1]),
+            last_effective_price=Subquery(latest.values('effective_price')[:1]),
+        )
+        .filter(
+            Q(last_price__isnull=True)
+            | ~Q(last_price=F('price'))
+            | ~Q(last_effective_price=F('effective_price'))
+        )
+        .values_list('pk', 'price', 'effective_price')
+    )
+    now = timezone.now()
+    return len(PriceHistory.objects.bulk_create(
+        [
+            PriceHistory(product_id=pk, price=price, effective_price=effective, valid_from=now)
+            for pk, price, effective in changed
+        ],
+        batch_size=1000,
+    ))
+
+
+def with_price_at(queryset, when):
+    """
+    Annotate products with ``price_at`` and ``effective_price_at``, their prices at ``when``.
+
+    Both are NULL for products with no history before ``when``. Each value is
+    one index lookup on (product, valid_from), so a page of products costs a
+    single query.
+    """
+    history = _latest_history(when)
+    return queryset.annotate(
+        price_at=Subquery(history.values('price')[:1], output_field=PRICE_FIELD),
+        effective_price_at=Subquery(history.values('effective_price')[:1], output_field=PRICE_FIELD),
+    )
+
+
+def with_lowest_price(queryset, since):
+    """
+    Annotate products with ``lowest_price``, the lowest effective price since ``since``.
+
+    Covers the price already in effect at ``since`` as well as every change
+    after it, e.g. ``with_lowest_price(products, now - timedelta(days=30))``
+    for a "lowest price in 30 days" badge.
+    """
+    at_start = Subquery(_latest_history(since).values('effective_price')[:1])
+    changes = Subquery(
+        PriceHistory.objects.filter(product=OuterRef('pk'), valid_from__gt=since)
+        .order_by()
+        .values('product')
+        .annotate(lowest=Min('effective_price'))
+        .values('lowest')
+    )
+    # LEAST is NULL-unsafe on some backends, so neither argument may be NULL
+    # unless both are
+    return queryset.annotate(
+        lowest_price=Least(
+            Coalesce(changes, at_start), Coalesce(at_start, changes), output_field=PRICE_FIELD,
+        ),
+    )
@@ -0,0 +1,155 @@
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from admin_panel.models import AuditLog
+from storefront.models import Product, Review
+from storefront.utils.eligibility import invalidate_eligibility
+
+# Reviews shown on the product page and returned per "load more" request
+REVIEW_PAGE_SIZE = 10
+
+
+def recalculate_product_ratings(product_ids):
+    """
+    Recompute ``rating`` and ``rating_histogram`` for every product in ``product_ids``.
+
+    Per-star counts of approved reviews for all products come from one grouped
+    aggregate, the average is derived from them, and the products are written
+    back with ``bulk_update``; products without approved reviews are reset.
+    Ratings are not part of the product edit form, so ``version`` is left
+    alone. Returns the number of products written.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return 0
+
+    counts = (
+        Review.objects.filter(product_id__in=product_ids, is_approved=True)
+        .values('product_id', 'rating')
+        .annotate(count=Count('id'))
+        .order_by('product_id', 'rating')
+        .values_list('product_id', 'rating', 'count')
+    )
+    histograms = {
+        product_id: {str(rating): count for _, rating, count in rows}
+        for product_id, rows in groupby(counts, key=lambda row: row[0])
+    }
+
+    now = timezone.now()
+    products = []
+    for product_id in product_ids:
+        histogram = histograms.get(product_id, {})
+        total = sum(histogram.values())
+        average = sum(int(stars) * count for stars, count in histogram.items()) / total if total else 0
+        products.append(Product(
+            pk=product_id,
+            # Rounded to the stored precision
+            rating=round(Decimal(str(average)), 1),
+            rating_histogram=histogram,
+            updated_at=now,
+        ))
+    Product.objects.bulk_update(products, ['rating', 'rating_histogram', 'updated_at'], batch_size=1000)
+    return len(products)
+
+
+def _moderation_audit(rows, action, verb, actor):
+    return AuditLog.objects.bulk_create([
+        AuditLog(
+            actor=actor,
+            action=action,
+            entity_type='Review',
+            entity_id=str(review_id),
+            summary=f'{verb} review for {product_name}'
+        )
+        for review_id, _, product_name in rows
+    ])
+
+
+def approve_reviews(review_ids, actor=None):
+    """
+    Approve the pending reviews among ``review_ids``.
+
+    One guarded UPDATE approves them, one insert audits them and the affected
+    product ratings are recomputed together. Reviews that are already
+    approved or no longer exist are skipped. Returns the approved count.
+    """
+    with transaction.atomic():
+        rows = list(
+            Review.objects.filter(pk__in=review_ids, is_approved=False)
+            .values_list('pk', 'product_id', 'product__name')
+        )
+        if not rows:
+            return 0
+        approved = Review.objects.filter(
+            pk__in=[pk for pk, _, _ in rows], is_approved=False
+        ).update(is_approved=True)
+        _moderation_audit(rows, 'update', 'Approved', actor)
+        recalculate_product_ratings(product_id for _, product_id, _ in rows)
+    return approved
+
+
+def reject_reviews(review_ids, actor=None):
+    """
+    Delete the reviews among ``review_ids`` and recompute affected ratings.
+
+    Audit rows are written before the single DELETE so they keep the product
+    name. Returns the number of reviews deleted.
+    """
+    with transaction.atomic():
+        rows = list(
+            Review.objects.filter(pk__in=review_ids)
+            .values_list('pk', 'product_id', 'product__name', 'customer_id')
+        )
+        if not rows:
+            return 0
+        _moderation_audit([row[:3] for row in rows], 'delete', 'Rejected', actor)
+        deleted, _ = Review.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        recalculate_product_ratings(row[1] for row in rows)
+        # A rejected customer may review the product again
+        customer_ids = {row[3] for row in rows}
+        transaction.on_commit(lambda: invalidate_eligibility(customer_ids))
+    return deleted
+
+
+def encode_review_cursor(review):
+    return f'{review.created_at.isoformat()}_{review.pk}'
+
+
+def decode_review_cursor(cursor):
+    """Parse a cursor from ``encode_review_cursor``; raises ValueError if malformed."""
+    created_at, _, pk = cursor.rpartition('_')
+    return datetime.fromisoformat(created_at), int(pk)
+
+
+def review_page(product, cursor=None, size=REVIEW_PAGE_SIZE):
+    """
+    Return ``(reviews, next_cursor)`` for ``product``'s approved reviews, newest first.
+
+    Pages are keyed on ``(created_at, id)`` rather than offsets, so every page
+    costs the same however deep the reader scrolls. ``next_cursor`` is None
+    on the last page. Raises ValueError for a malformed ``cursor``.
+    """
+    reviews = (
+        Review.objects.filter(product=product, is_approved=True)
+        .select_related('customer__user')
+        .only(
+            'rating', 'title', 'comment', 'created_at',
+            'customer__user__first_name', 'customer__user__last_name',
+        )
+        .order_by('-created_at', '-id')
+    )
+    if cursor:
+        created_at, pk = decode_review_cursor(cursor)
+        reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # One extra row tells us whether another page exists
+    page = list(reviews[:size + 1])
+    if len(page) > size:
+        page = page[:size]
+        return page, encode_review_cursor(page[-1])
+    return page, None
@@ -0,0 +1,181 @@
+"""
+Watchlist price-drop and back-in-stock notifications.
+
+``notify_watchlist_changes`` walks watchlist items in primary-key ranges. For
+each range it fetches only the items whose product's current effective price
+or availability differs from the item's snapshot, computed in SQL. It writes
+the notifications to the WatchlistNotification outbox and moves the snapshots
+forward. ``send_watchlist_notifications`` delivers the outbox by mail.
+
+``watchlist_product_ids`` is the customer's set of watched product ids, so
+product grids can show membership without per-card lookups.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Max, Q
+from django.utils import timezone
+
+from storefront.models import WatchlistItem, WatchlistNotification
+from storefront.utils.caching import CACHE_KEY_WATCHLIST_IDS, WATCHLIST_IDS_TIMEOUT
+from storefront.utils.pricing import effective_price
+
+# Watchlist items examined per range, and notifications sent per batch
+WATCHLIST_BATCH_SIZE = 5000
+NOTIFICATION_BATCH_SIZE = 500
+
+
+def watchlist_product_ids(request):
+    """
+    Ids of the products on the current customer's watchlist (empty for guests).
+
+    Loaded with one query, cached briefly per customer and memoised on the
+    request, so every product card on a page is a set lookup.
+    """
+    ids = getattr(request, '_watchlist_product_ids', None)
+    if ids is None:
+        ids = set()
+        if request.user.is_authenticated and hasattr(request.user, 'customer_profile'):
+            key = CACHE_KEY_WATCHLIST_IDS.format(request.user.customer_profile.pk)
+            ids = cache.get(key)
+            if ids is None:
+                ids = set(
+                    WatchlistItem.objects.filter(watchlist__customer=request.user.customer_profile)
+                    .values_list('product_id', flat=True)
+                )
+                cache.set(key, ids, WATCHLIST_IDS_TIMEOUT)
+        request._watchlist_product_ids = ids
+    return ids
+
+
+def update_watchlist_product_ids(request, product_id, watched):
+    """Add or remove ``product_id`` in the cached set after the watchlist changed."""
+    ids = watchlist_product_ids(request)
+    if watched:
+        ids.add(product_id)
+    else:
+        ids.discard(product_id)
+    cache.set(CACHE_KEY_WATCHLIST_IDS.format(request.user.customer_profile.pk), ids, WATCHLIST_IDS_TIMEOUT)
+
+
+def _changed_items(start, stop, today=None):
+    """Items in ``[start, stop)`` whose snapshot no longer matches the product."""
+    return (
+        WatchlistItem.objects.filter(
+            pk__gte=start, pk__lt=stop,
+            product__is_active=True, product__archived=False,
+        )
+        .annotate(
+            current_price=effective_price('product__price', 'product_id', 'product__category_id', today),
+            current_in_stock=ExpressionWrapper(Q(product__stock__gt=0), output_field=BooleanField()),
+        )
+        .filter(
+            Q(snapshot_price__isnull=True)
+            | Q(snapshot_in_stock__isnull=True)
+            | ~Q(snapshot_price=F('current_price'))
+            | ~Q(snapshot_in_stock=F('current_in_stock'))
+        )
+        .values_list(
+            'pk', 'watchlist__customer_id', 'product_id',
+            'snapshot_price', 'snapshot_in_stock', 'current_price', 'current_in_stock',
+        )
+    )
+
+
+def notify_watchlist_changes(batch_size=WATCHLIST_BATCH_SIZE, today=None):
+    """
+    Queue notifications for watched products that got cheaper or came back in stock.
+
+    Each range of items costs one diff query, one outbox insert and a
+    ``bulk_update`` of the snapshots that moved, so the cost grows with the
+    number of changes rather than per item. Items without a snapshot
+    are baselined silently. Returns ``(notifications, snapshots_updated)``.
+    """
+    last_id = WatchlistItem.objects.aggregate(last=Max('pk'))['last'] or 0
+    notified = refreshed = 0
+    for start in range(1, last_id + 1, batch_size):
+        rows = list(_changed_items(start, start + batch_size, today))
+        if not rows:
+            continue
+
+        notifications = []
+        items = []
+        for pk, customer_id, product_id, old_price, was_in_stock, price, in_stock in rows:
+            if old_price is not None and price < old_price:
+                notifications.append(WatchlistNotification(
+                    customer_id=customer_id, product_id=product_id,
+                    kind='price_drop', previous_price=old_price, price=price,
+                ))
+            if was_in_stock is False and in_stock:
+                notifications.append(WatchlistNotification(
+                    customer_id=customer_id, product_id=product_id,
+                    kind='back_in_stock', price=price,
+                ))
+            items.append(WatchlistItem(pk=pk, snapshot_price=price, snapshot_in_stock=in_stock))
+
+        with transaction.atomic():
+            WatchlistNotification.objects.bulk_create(notifications, batch_size=1000)
+            WatchlistItem.objects.bulk_update(
+                items, ['snapshot_price', 'snapshot_in_stock'], batch_size=1000
+            )
+        notified += len(notifications)
+        refreshed += len(items)
+    return notified, refreshed
+
+
+def _notification_email(customer, notifications):
+    lines = []
+    for notification in notifications:
+        if notification.kind == 'price_drop':
+            lines.append(
+                f'- {notification.product.name} dropped from ${notification.previous_price} '
+                f'to ${notification.price}'
+            )
+        else:
+            lines.append(f'- {notification.product.name} is back in stock at ${notification.price}')
+    body = (
+        f'Hi {customer.user.first_name or customer.user.username},\n\n'
+        'Good news about items on your AuroraMart watchlist:\n\n'
+        + '\n'.join(lines)
+        + '\n'
+    )
+    return EmailMessage(
+        subject='Updates on your AuroraMart watchlist',
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[customer.user.email],
+    )
+
+
+def send_watchlist_notifications(batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Mail pending notifications, one message per customer per batch.
+
+    Messages in a batch share one mail connection, and the whole batch is then
+    marked sent with a single UPDATE. If sending fails, the batch stays
+    pending and is retried on the next run. Customers without an email
+    address are marked sent without a message. Returns ``(notifications, emails)``.
+    """
+    sent = emails = 0
+    connection = get_connection()
+    while True:
+        batch = list(
+            WatchlistNotification.objects.filter(sent_at__isnull=True)
+            .select_related('customer__user', 'product')
+            .order_by('customer_id', 'id')[:batch_size]
+        )
+        if not batch:
+            return sent, emails
+
+        messages = [
+            _notification_email(customer, list(notifications))
+            for customer, notifications in groupby(batch, key=lambda n: n.customer)
+            if customer.user.email
+        ]
+        connection.send_messages(messages)
+        WatchlistNotification.objects.filter(pk__in=[n.pk for n in batch]).update(sent_at=timezone.now())
+        sent += len(batch)
+        emails += len(messages)
@@ -1,22 +1,37 @@
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.db.models import Count, Prefetch, Q
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
 from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 import pytz
 from datetime import date, timedelta
 from decimal import Decimal
-from .models import Product, Category, Cart, CartItem, Order, OrderItem, Review, Watchlist, WatchlistItem, Promotion, ChatSession, ChatMessage, AiChatSession, AiChatMessage
+from .models import Product, Category, Cart, CartItem, Order, OrderItem, ArchivedOrder, Review, Watchlist, WatchlistItem, Promotion, ChatSession, ChatMessage, AiChatSession
 from users.models import Customer
 from .forms import CheckoutForm, ReviewForm, ChatForm, ChatMessageForm
+from .utils.inventory import apply_stock_deltas
+from .utils.eligibility import get_eligibility, has_purchased as customer_has_purchased, has_reviewed as customer_has_reviewed
+from .utils.orders import cancel_order, get_customer_order
+from .utils.pricing import with_effective_price
+from .utils.watchlist import update_watchlist_product_ids, watchlist_product_ids
+from .utils.reviews import review_page
+from .utils.aurora import (
+    REPLY_TIMEOUT_ERROR, REPLY_UNAVAILABLE_ERROR, reply_event_stream, save_exchange,
+)
+from .utils.chat import chat_event_stream, messages_since, parse_since_id, transcript_page
 from mlservices.get_recommendations import get_product_recommendations
 from mlservices.gemini_context import create_gemini_context
+from mlservices.gemini_client import get_async_client, get_client, token_usage
 from admin_panel.models import RecommendationPlacement
-from google import genai
+from google.genai import errors as genai_errors
+from asgiref.sync import sync_to_async
+import asyncio
+import httpx
 import markdown2
 
 # Helper function to annotate products with promotion data
@@ -355,19 +370,10 @@ def product_detail(request, sku):
         archived=False
     ) 
     
-    # Get approved reviews for this product
-    reviews = product.reviews.filter(is_approved=True).order_by('-created_at')
-    
-    # Calculate review statistics
-    total_reviews = reviews.count()
-    if total_reviews > 0:
-        average_rating = sum(review.rating for review in reviews) / total_reviews
-        # Update product rating if different (only if there are approved reviews)
-        if product.rating != average_rating:
-            product.rating = round(average_rating, 2)
-            product.save()
-    else:
-        average_rating = 0.0
+    # First page of approved reviews; the rest are fetched from product_reviews.
+    # Totals come from the stored histogram rather than counting reviews here
+    reviews, next_cursor = review_page(product)
+    total_reviews = product.approved_review_count
     
     # Check if user can review (has purchased and hasn't reviewed yet)
     can_review = False
@@ -378,26 +384,15 @@ def product_detail(request, sku):
     if request.user.is_authenticated and hasattr(request.user, 'customer_profile'):
         customer = request.user.customer_profile
         # Check if user has purchased this product
-        has_purchased = OrderItem.objects.filter(
-            order__customer=customer,
-            order__status='delivered',
-            product=product
-        ).exists()
+        has_purchased = customer_has_purchased(customer, product)
         
         # Check if user has already reviewed this product
-        has_reviewed = Review.objects.filter(
-            customer=customer,
-            product=product
-        ).exists()
+        has_reviewed = customer_has_reviewed(customer, product)
         
         can_review = has_purchased and not has_reviewed
         
         # Check if product is in watchlist
-        try:
-            watchlist = Watchlist.objects.get(customer=customer)
-            is_in_watchlist = WatchlistItem.objects.filter(watchlist=watchlist, product=product).exists()
-        except Watchlist.DoesNotExist:
-            is_in_watchlist = False
+        is_in_watchlist = product.pk in watchlist_product_ids(request)
     
     # Get active promotions for this product
     # Priority: Product-specific promotions > Category-based promotions
@@ -442,8 +437,9 @@ def product_detail(request, sku):
         'product': product,
         'similar_items': similar_items,
         'reviews': reviews,
+        'next_cursor': next_cursor,
         'total_reviews': total_reviews,
-        'average_rating': average_rating,
+        'rating_distribution': product.rating_distribution(),
         'can_review': can_review,
         'has_purchased': has_purchased,
         'has_reviewed': has_reviewed,
@@ -454,6 +450,19 @@ def product_detail(request, sku):
     })
 
 
+def product_reviews(request, sku):
+    """Return the next page of a product's approved reviews as JSON (for "load more")"""
+    product = get_object_or_404(Product, sku=sku, is_active=True, archived=False)
+    try:
+        reviews, next_cursor = review_page(product, cursor=request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'reviews': [review.serialize() for review in reviews],
+        'next_cursor': next_cursor,
+    })
+
+
 # ============ CART FUNCTIONALITY ============
 
 def get_cart_items(request):
@@ -692,34 +701,39 @@ def checkout_view(request):
             # Create order with transaction to ensure data consistency
             try:
                 with transaction.atomic():
-                    # Create the order
-                    order = Order.objects.create(
-                        customer=request.user.customer_profile,
-                        status='pending',
-                        total_price=total,
-                        shipping_address=form.get_formatted_address()
-                    )
-                    
-                    # Create order items from cart
+                    # Build order items from cart
+                    order_items = []
+                    quantities = {}
                     for item in cart_items:
-                        # Check stock availability
                         product = item.product if hasattr(item, 'product') else item['product']
                         quantity = item.quantity if hasattr(item, 'quantity') else item['quantity']
-                        
-                        if product.stock < quantity:
-                            raise ValueError(f'Insufficient stock for {product.name}')
-                        
-                        # Create order item
-                        OrderItem.objects.create(
-                            order=order,
+                        order_items.append(OrderItem(
                             product=product,
                             quantity=quantity,
                             unit_price=product.price
-                        )
-                        
-                        # Reduce product stock
-                        product.stock -= quantity
-                        product.save()
+                        ))
+                        quantities[product.pk] = quantities.get(product.pk, 0) + quantity
+                    
+                    # Create the order with its list-view summary already filled in
+                    item_count, summary = Order.build_summary(order_items)
+                    order = Order.objects.create(
+                        customer=request.user.customer_profile,
+                        status='pending',
+                        total_price=total,
+                        shipping_address=form.get_formatted_address(),
+                        item_count=item_count,
+                        summary=summary
+                    )
+                    for order_item in order_items:
+                        order_item.order = order
+                    OrderItem.objects.bulk_create(order_items)
+                    
+                    # Reduce stock for the whole cart in one guarded update; raises
+                    # InsufficientStock (a ValueError) and rolls back if any item is short
+                    apply_stock_deltas(
+                        {pk: -quantity for pk, quantity in quantities.items()},
+                        'checkout', reference=order.id, actor=request.user
+                    )
                     
                     # Clear the cart
                     if request.user.is_authenticated and hasattr(request.user, 'customer_profile'):
@@ -768,10 +782,21 @@ def order_list_view(request):
         messages.error(request, 'You must be a customer to view orders.')
         return redirect('storefront:home')
     
-    orders = Order.objects.filter(customer=request.user.customer_profile).order_by('-created_at')
+    # Item counts and previews come from the denormalised order summary, so the
+    # page reads one row per order regardless of history size
+    # Recent history reads the hot table only; older orders live in the archive
+    show_archived = request.GET.get('archived') == '1'
+    order_model = ArchivedOrder if show_archived else Order
+    orders = order_model.objects.filter(customer=request.user.customer_profile).order_by('-created_at', '-id')
+    
+    paginator = Paginator(orders, 10)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
     
     return render(request, 'storefront/order_list.html', {
-        'orders': orders,
+        'orders': page_obj,
+        'page_obj': page_obj,
+        'show_archived': show_archived,
     })
 
 
@@ -782,13 +807,17 @@ def order_detail_view(request, order_id):
         messages.error(request, 'You must be a customer to view orders.')
         return redirect('storefront:home')
     
-    order = get_object_or_404(Order, id=order_id, customer=request.user.customer_profile)
+    # Falls back to the archive for old delivered/cancelled orders
+    order = get_customer_order(request.user.customer_profile, order_id)
+    if order is None:
+        raise Http404('Order not found')
     
     # Check if order can be cancelled (< 24 hours old and status is pending)
     from django.utils import timezone
     from datetime import timedelta
     
     can_cancel = (
+        not order.is_archived and
         order.status == 'pending' and 
         order.created_at >= timezone.now() - timedelta(hours=24)
     )
@@ -796,12 +825,10 @@ def order_detail_view(request, order_id):
     # Check which products can be reviewed (delivered orders only)
     reviewable_items = []
     if order.status == 'delivered' and hasattr(request.user, 'customer_profile'):
-        for item in order.items.all():
-            # Check if user has already reviewed this product
-            has_reviewed = Review.objects.filter(
-                customer=request.user.customer_profile,
-                product=item.product
-            ).exists()
+        # One cached set of reviewed products covers every line item
+        reviewed = get_eligibility(request.user.customer_profile)['reviewed']
+        for item in order.items.select_related('product'):
+            has_reviewed = item.product_id in reviewed
             
             reviewable_items.append({
                 'item': item,
@@ -837,16 +864,13 @@ def cancel_order_view(request, order_id):
         messages.error(request, 'Orders can only be cancelled within 24 hours of placement.')
         return redirect('storefront:order_detail', order_id=order_id)
     
-    # Cancel the order and restore stock
-    with transaction.atomic():
-        order.status = 'cancelled'
-        order.save()
-        
-        # Restore product stock
-        for item in order.items.all():
-            item.product.stock += item.quantity
-            item.product.save()
-    
+    # Cancel the order and restore stock in one set-based update
+    if not cancel_order(order, actor=request.user):
+        # The order changed status since the page was loaded; report where it is now
+        order.refresh_from_db(fields=['status'])
+        messages.info(request, f'Order #{order.id} is now {order.get_status_display()} and can no longer be cancelled.')
+        return redirect('storefront:order_detail', order_id=order_id)
+
     messages.success(request, f'Order #{order.id} has been cancelled.')
     return redirect('storefront:order_list')
 
@@ -864,19 +888,14 @@ def review_create_view(request, sku):
     customer = request.user.customer_profile
     
     # Check if user has purchased this product
-    has_purchased = OrderItem.objects.filter(
-        order__customer=customer,
-        order__status='delivered',
-        product=product
-    ).exists()
+    has_purchased = customer_has_purchased(customer, product)
     
     if not has_purchased:
         messages.error(request, 'You must have purchased this product to write a review.')
         return redirect('storefront:product_detail', sku=sku)
     
     # Check if user has already reviewed this product
-    existing_review = Review.objects.filter(customer=customer, product=product).first()
-    if existing_review:
+    if customer_has_reviewed(customer, product):
         messages.warning(request, 'You have already reviewed this product.')
         return redirect('storefront:product_detail', sku=sku)
     
@@ -956,15 +975,20 @@ def add_to_watchlist(request, sku):
         return redirect('storefront:product_detail', sku=sku)
     
     product = get_object_or_404(Product, sku=sku, is_active=True, archived=False)
-    customer = request.user.customer_profile
-    watchlist = get_or_create_watchlist(customer)
     
-    # Check if already in watchlist
-    if WatchlistItem.objects.filter(watchlist=watchlist, product=product).exists():
-        messages.info(request, f'{product.name} is already in your watchlist.')
-    else:
-        WatchlistItem.objects.create(watchlist=watchlist, product=product)
+    # Checked against the table rather than the cached id set, which may lag
+    # changes made elsewhere. The snapshot baselines watchlist notifications
+    price = with_effective_price(Product.objects.filter(pk=product.pk)).values_list('effective_price', flat=True).get()
+    _, created = WatchlistItem.objects.get_or_create(
+        watchlist=get_or_create_watchlist(request.user.customer_profile),
+        product=product,
+        defaults={'snapshot_price': price, 'snapshot_in_stock': product.stock > 0},
+    )
+    update_watchlist_product_ids(request, product.pk, watched=True)
+    if created:
         messages.success(request, f'{product.name} has been added to your watchlist.')
+    else:
+        messages.info(request, f'{product.name} is already in your watchlist.')
     
     # Redirect back to the appropriate page
     next_url = request.GET.get('next', 'storefront:product_detail')
@@ -997,12 +1021,11 @@ def remove_from_watchlist(request, sku):
     product = get_object_or_404(Product, sku=sku)
     customer = request.user.customer_profile
     
-    try:
-        watchlist = Watchlist.objects.get(customer=customer)
-        watchlist_item = WatchlistItem.objects.get(watchlist=watchlist, product=product)
-        watchlist_item.delete()
+    deleted, _ = WatchlistItem.objects.filter(watchlist__customer=customer, product=product).delete()
+    update_watchlist_product_ids(request, product.pk, watched=False)
+    if deleted:
         messages.success(request, f'{product.name} has been removed from your watchlist.')
-    except (Watchlist.DoesNotExist, WatchlistItem.DoesNotExist):
+    else:
         messages.error(request, 'Item not found in your watchlist.')
     
     # Redirect back based on referrer
@@ -1073,29 +1096,20 @@ def chat_list(request):
         return redirect('storefront:home')
     
     customer = request.user.customer_profile
+    # Unread counts are stored on the session; only each session's opening
+    # message is fetched, for the preview
     chat_sessions = (
         ChatSession.objects
         .filter(customer=customer)
         .select_related('order')
-        .prefetch_related('messages')
+        .prefetch_related(Prefetch(
+            'messages',
+            queryset=ChatMessage.objects.order_by('created_at', 'id')[:1],
+            to_attr='first_messages',
+        ))
         .order_by('-updated_at')
     )
     
-    # Track how many NEW admin messages have arrived since the customer's last message
-    # This avoids a forever-increasing counter without adding new DB fields.
-    for session in chat_sessions:
-        admin_messages = session.messages.filter(sender='admin')
-        last_customer_msg = session.messages.filter(sender='customer').order_by('-created_at').first()
-        
-        if last_customer_msg:
-            # Only count admin messages sent after the customer's last reply
-            unread_admin_messages = admin_messages.filter(created_at__gt=last_customer_msg.created_at)
-        else:
-            # If the customer has never replied, treat all admin messages as "new"
-            unread_admin_messages = admin_messages
-        
-        session.unread_count = unread_admin_messages.count()
-    
     return render(request, 'storefront/chat_list.html', {
         'chat_sessions': chat_sessions,
     })
@@ -1111,32 +1125,89 @@ def chat_detail(request, session_id):
     customer = request.user.customer_profile
     chat_session = get_object_or_404(ChatSession, id=session_id, customer=customer)
     
+    is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
     if request.method == 'POST':
         form = ChatMessageForm(request.POST)
         if form.is_valid():
             chat_message = form.save(commit=False)
             chat_message.session = chat_session
             chat_message.sender = 'customer'
+            # Saving the message also bumps the session's updated_at and activity
             chat_message.save()
             
-            # Update session updated_at
-            chat_session.save()  # This will update updated_at due to auto_now
-            
+            if is_ajax:
+                return JsonResponse({'message': chat_message.serialize()}, status=201)
             messages.success(request, 'Message sent.')
             return redirect('storefront:chat_detail', session_id=session_id)
+        if is_ajax:
+            return JsonResponse({'error': form.errors.get_json_data()}, status=400)
     else:
         form = ChatMessageForm()
     
-    # Get all messages (use chat_messages to avoid conflict with Django messages)
-    chat_messages = chat_session.messages.all().order_by('created_at')
+    # Only the latest page is rendered; earlier messages load on request
+    # (use chat_messages to avoid conflict with Django messages)
+    chat_messages, earlier_cursor = transcript_page(chat_session.messages.all())
     
     return render(request, 'storefront/chat_detail.html', {
         'chat_session': chat_session,
         'messages_list': chat_messages,
+        'earlier_cursor': earlier_cursor,
+        # New messages are streamed to the page from here on
+        'last_message_id': chat_messages[-1].id if chat_messages else 0,
         'form': form,
     })
 
 
+def _customer_chat_session_id(request, session_id):
+    """The id of a chat session owned by the current customer, or 404"""
+    customer = getattr(request.user, 'customer_profile', None)
+    if customer is None or not ChatSession.objects.filter(id=session_id, customer=customer).exists():
+        raise Http404('Chat session not found.')
+    return session_id
+
+
+@login_required
+def chat_messages(request, session_id):
+    """
+    Return chat session messages as JSON: those posted after ``since_id``, or
+    with ``before`` the page of earlier messages ahead of that cursor
+    """
+    session_id = _customer_chat_session_id(request, session_id)
+    if 'before' in request.GET:
+        try:
+            page, earlier_cursor = transcript_page(
+                ChatMessage.objects.filter(session_id=session_id), before=request.GET['before']
+            )
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return JsonResponse({
+            'messages': [message.serialize() for message in page],
+            'earlier_cursor': earlier_cursor,
+        })
+    try:
+        since_id = parse_since_id(request.GET.get('since_id'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since_id.'}, status=400)
+    new_messages = [message.serialize() for message in messages_since(session_id, since_id)]
+    return JsonResponse({
+        'messages': new_messages,
+        'last_id': new_messages[-1]['id'] if new_messages else since_id,
+    })
+
+
+@login_required
+def chat_stream(request, session_id):
+    """Push new messages in a chat session as server-sent events"""
+    session_id = _customer_chat_session_id(request, session_id)
+    try:
+        since_id = parse_since_id(
+            request.headers.get('Last-Event-ID') or request.GET.get('since_id')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since_id.'}, status=400)
+    return chat_event_stream(request, session_id, since_id)
+
+
 @login_required
 def chat_close(request, session_id):
     """Close a chat session"""
@@ -1149,7 +1220,7 @@ def chat_close(request, session_id):
     
     if request.method == 'POST':
         chat_session.status = 'closed'
-        chat_session.save()
+        chat_session.save(update_fields=['status', 'updated_at'])
         messages.success(request, 'Chat session closed.')
         return redirect('storefront:chat_list')
     
@@ -1226,10 +1297,31 @@ def aurora_chatbot_view(request):
     # Use get_or_create to simplify finding or creating an active session
     session, created = AiChatSession.objects.get_or_create(customer=customer, is_active=True)
     
+    # Only the latest page is rendered; earlier messages load on request
+    transcript, earlier_cursor = transcript_page(session.messages.all(), 'timestamp')
+
     # Set timezone
     timezone.activate(pytz.timezone(settings.SG_TIME_ZONE))
     return render(request, 'storefront/aurora.html', {
         "session": session,
+        "transcript": transcript,
+        "earlier_cursor": earlier_cursor,
+    })
+
+@login_required
+def aurora_messages(request, session_id):
+    """Return the page of Aurora messages ahead of the ``before`` cursor as JSON"""
+    customer = getattr(request.user, 'customer_profile', None)
+    session = get_object_or_404(AiChatSession.objects.only('id'), pk=session_id, customer=customer)
+    try:
+        page, earlier_cursor = transcript_page(
+            session.messages.all(), 'timestamp', before=request.GET.get('before')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return JsonResponse({
+        'messages': [message.serialize() for message in page],
+        'earlier_cursor': earlier_cursor,
     })
 
 @login_required
@@ -1244,56 +1336,89 @@ def clear_chat(request, session_id):
 
     if request.method == 'POST':
         session.is_active = False
-        session.save()
+        # Only these fields, so a summary written meanwhile is not overwritten
+        session.save(update_fields=['is_active', 'updated_at'])
         return redirect('storefront:aurora_chatbot')
 
     return redirect('storefront:aurora_chatbot')
 
-@login_required
-def ask_aurora(request):
-    """Handle user queries to the Aurora chatbot"""
+async def _aurora_request(request):
+    """
+    Validate an Aurora question, returning ``(session, user_query, None)`` or
+    ``(None, None, error_response)``
+    """
     if request.method != 'POST':
-        return JsonResponse({'error': 'Invalid request method.'}, status=405)
+        return None, None, JsonResponse({'error': 'Invalid request method.'}, status=405)
+
+    # request.user is loaded lazily from the database, so resolve it off the event loop
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return None, None, JsonResponse({'error': 'Authentication required.'}, status=401)
 
     session_id = request.POST.get('session_id')
     user_query = request.POST.get('message_content', '').strip()
 
     if not session_id or not user_query:
-        return JsonResponse({'error': 'Session ID and message are required.'}, status=400)
+        return None, None, JsonResponse({'error': 'Session ID and message are required.'}, status=400)
 
     try:
-        session = AiChatSession.objects.get(pk=session_id, customer=request.user.customer_profile)
-    except AiChatSession.DoesNotExist:
-        return JsonResponse({'error': 'Chat session not found.'}, status=404)
-
-    # 1. Save the user's message
-    gemini_context = create_gemini_context(session, user_query)
-    user_message = AiChatMessage.objects.create(
-        session=session,
-        sender='user',
-        content=user_query
-    )
-
-    # 2.  Call the API (using the SDK/HTTP)
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-    response = client.models.generate_content(
-        model='gemini-2.5-flash',
-        contents=gemini_context
-    )
-    token_usage = ( # billable token usage
-        response.usage_metadata.prompt_token_count +
-        response.usage_metadata.candidates_token_count
-    )
-    bot_message = AiChatMessage.objects.create( # save response
-        session=session,
-        sender='bot',
-        content=response.text,
-        token_usage=token_usage,
-        model_used=response.model_version
+        session = await AiChatSession.objects.select_related('customer').aget(
+            pk=session_id, customer__user_id=user.pk
+        )
+    except (AiChatSession.DoesNotExist, ValueError):
+        return None, None, JsonResponse({'error': 'Chat session not found.'}, status=404)
+    return session, user_query, None
+
+
+async def ask_aurora(request):
+    """
+    Handle user queries to the Aurora chatbot.
+
+    Async so that, served over ASGI, a worker is not pinned while the model
+    replies: the call goes through the shared pooled client and is abandoned
+    after GEMINI_TIMEOUT_SECONDS. Nothing is stored unless the model replies.
+    """
+    session, user_query, error_response = await _aurora_request(request)
+    if error_response:
+        return error_response
+
+    # 1. Build the prompt from the history and catalog/order context
+    gemini_context = await sync_to_async(create_gemini_context)(session, user_query)
+
+    # 2. Call the API through the shared client
+    if isinstance(request, ASGIRequest):
+        call = get_async_client().models.generate_content(
+            model=settings.GEMINI_MODEL, contents=gemini_context
+        )
+    else:
+        # Under WSGI each request runs on its own short-lived event loop, which
+        # cannot keep a connection pool, so the pooled sync client runs in a thread
+        call = sync_to_async(get_client().models.generate_content, thread_sensitive=False)(
+            model=settings.GEMINI_MODEL, contents=gemini_context
+        )
+    try:
+        response = await asyncio.wait_for(call, timeout=settings.GEMINI_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': REPLY_TIMEOUT_ERROR}, status=504)
+    except (genai_errors.APIError, httpx.HTTPError):
+        return JsonResponse({'error': REPLY_UNAVAILABLE_ERROR}, status=502)
+
+    # 3. Save both messages and return them to be rendered by the frontend
+    user_message, bot_message = await sync_to_async(save_exchange)(
+        session, user_query, response.text, token_usage(response), response.model_version
     )
-
-    # 3. Return both messages to be rendered by the frontend
     return JsonResponse({
         'user_message': user_message.serialize(),
         'bot_message': bot_message.serialize(),
     })
+
+async def ask_aurora_stream(request):
+    """Handle user queries to the Aurora chatbot, streaming the reply as server-sent events"""
+    session, user_query, error_response = await _aurora_request(request)
+    if error_response:
+        return error_response
+
+    gemini_context = await sync_to_async(create_gemini_context)(session, user_query)
+    return reply_event_stream(
+        session, user_query, gemini_context, native_async=isinstance(request, ASGIRequest)
+    )
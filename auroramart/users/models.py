@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
+from core.models import FieldTrackerMixin
+
 # Create your models here.
 class User(AbstractUser):
     @property
@@ -13,7 +15,7 @@ class User(AbstractUser):
         return hasattr(self, "admin_profile")
 
 
-class Customer(models.Model):
+class Customer(FieldTrackerMixin, models.Model):
     GENDER_CHOICES = [
         ("Male", "Male"),
         ("Female", "Female"),
@@ -68,6 +70,12 @@ class Customer(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    tracked_fields = (
+        'age', 'household_size', 'has_children', 'monthly_income_sgd', 'gender',
+        'employment_status', 'occupation', 'education', 'preferred_category',
+        'preferred_category_fk_id',
+    )
     
     def __str__(self):
         return f"Customer: {self.user.username}"